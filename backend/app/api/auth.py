@@ -1,20 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import RedirectResponse
-from google_auth_oauthlib.flow import Flow
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 import json
 
 from app.core.config import settings
-from app.models.repositories import UserRepository
+from app.models.async_repositories import AsyncUserRepository
 from app.models.schemas import UserResponse
 
+# google_auth_oauthlib / google.oauth2 are imported on first OAuth request
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import Flow
+
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-def create_oauth_flow(state: str = None) -> Flow:
+def create_oauth_flow(state: str = None) -> "Flow":
     """Create Google OAuth flow."""
+    from google_auth_oauthlib.flow import Flow
+    
     client_config = {
         "web": {
             "client_id": settings.GOOGLE_CLIENT_ID,
@@ -34,6 +39,25 @@ def create_oauth_flow(state: str = None) -> Flow:
     return flow
 
 
+def exchange_oauth_code(code: str, state: str) -> tuple:
+    """Exchange an authorization code for credentials and verify their ID token."""
+    flow = create_oauth_flow(state=state)
+    flow.fetch_token(code=code)
+    
+    credentials = flow.credentials
+    
+    # Get user email from ID token with clock skew tolerance
+    from google.oauth2 import id_token
+    from google.auth.transport import requests
+    id_info = id_token.verify_oauth2_token(
+        credentials.id_token,
+        requests.Request(),
+        settings.GOOGLE_CLIENT_ID,
+        clock_skew_in_seconds=60  # Allow 60 seconds clock skew
+    )
+    return credentials, id_info
+
+
 @router.get("/google")
 async def google_auth(username: str = Query(..., description="Username for booking link")):
     """
@@ -69,29 +93,18 @@ async def google_callback(code: str, state: str):
         if not username:
             raise HTTPException(status_code=400, detail="Missing username in state")
         
-        # Exchange code for tokens
-        flow = create_oauth_flow(state=state)
-        flow.fetch_token(code=code)
-        
-        credentials = flow.credentials
-        
-        # Get user email from ID token with clock skew tolerance
-        id_info = id_token.verify_oauth2_token(
-            credentials.id_token,
-            requests.Request(),
-            settings.GOOGLE_CLIENT_ID,
-            clock_skew_in_seconds=60  # Allow 60 seconds clock skew
-        )
+        # Token exchange and ID token verification call Google; keep them off the event loop
+        credentials, id_info = await run_in_threadpool(exchange_oauth_code, code, state)
         
         user_email = id_info.get('email')
         if not user_email:
             raise HTTPException(status_code=400, detail="Could not get email from Google")
         
         # Create or update user
-        user = UserRepository.get_user_by_email(user_email)
+        user = await AsyncUserRepository.get_user_by_email(user_email)
         
         if not user:
-            user = UserRepository.create_user(email=user_email, username=username)
+            user = await AsyncUserRepository.create_user(email=user_email, username=username)
         
         # Calculate token expiry
         token_expiry = datetime.utcnow() + timedelta(seconds=3600)  # Default 1 hour
@@ -99,7 +112,7 @@ async def google_callback(code: str, state: str):
             token_expiry = credentials.expiry
         
         # Update tokens (encrypted)
-        UserRepository.update_google_tokens(
+        await AsyncUserRepository.update_google_tokens(
             user_id=user['id'],
             access_token=credentials.token,
             refresh_token=credentials.refresh_token,
@@ -110,7 +123,7 @@ async def google_callback(code: str, state: str):
         redirect_url = f"{settings.FRONTEND_URL}/auth/success?user_id={user['id']}&username={user['username']}&email={user_email}"
         
         return RedirectResponse(url=redirect_url)
-        
+    
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid state parameter")
     except ValueError as e:
@@ -122,7 +135,7 @@ async def google_callback(code: str, state: str):
 @router.get("/user/{user_id}", response_model=UserResponse)
 async def get_user(user_id: int):
     """Get user details including booking link."""
-    user = UserRepository.get_user_by_id(user_id)
+    user = await AsyncUserRepository.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -1,55 +1,197 @@
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from datetime import datetime, timedelta
-from typing import List
+from typing import AsyncIterator, List, Optional
+import base64
+import json
 import traceback
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from psycopg.errors import ExclusionViolation
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.models.schemas import (
-    BookingRequest, BookingResponse, AvailabilityResponse, TimeSlot, MeetingListResponse, MeetingItem
+    BookingRequest, BookingResponse, AvailabilityResponse, TimeSlot, MeetingListResponse, MeetingItem,
+    TeamAvailabilityResponse, TeamTimeSlot
+)
+from app.models.async_repositories import (
+    AsyncUserRepository, AsyncMeetingRepository, AsyncEmailOutboxRepository
+)
+from app.services.google_calendar import CalendarUnavailableError, GoogleCalendarService
+from app.services.outbox_worker import (
+    CUSTOMER_CONFIRMATION, HOST_NOTIFICATION, meeting_email_payload
 )
-from app.models.repositories import UserRepository, MeetingRepository
-from app.services.google_calendar import GoogleCalendarService
-from app.services.email_service import EmailService
 from app.services.availability import AvailabilityService
-from app.core.database import get_db
+from app.services.booking_context import load_booking_context
+from app.core.config import settings
+from app.core.rate_limit import limiter
+from app.core.database import get_async_db
+from app.core.singleflight import AsyncSingleFlight
+from app.core.http_cache import (
+    cache_headers, floor_time, is_not_modified, make_etag, not_modified_response
+)
 
 router = APIRouter(tags=["Booking"])
-limiter = Limiter(key_func=get_remote_address)
+
+# Page sizes for GET /meetings pagination
+DEFAULT_MEETINGS_PAGE_SIZE = 100
+MAX_MEETINGS_PAGE_SIZE = 500
+
+# Concurrent identical availability requests share one computation
+availability_flights = AsyncSingleFlight()
 
 
 @router.get("/meetings", response_model=MeetingListResponse)
 async def get_meetings(
+    request: Request,
+    response: Response,
     user_id: int = Query(..., description="User ID to get meetings for"),
-    days: int = Query(default=30, ge=1, le=90, description="Number of days to look back and forward")
+    days: int = Query(default=30, ge=1, le=90, description="Number of days to look back and forward"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_MEETINGS_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    response_format: str = Query(default="json", alias="format", pattern="^(json|ndjson)$")
 ):
-    """Get all meetings for a user."""
-    user = UserRepository.get_user_by_id(user_id)
+    """
+    Get meetings for a user, ordered by start time.
+    
+    Without `limit` or `cursor` every meeting in the window is returned
+    and `next_cursor` is None. With either, the list is keyset-paginated on
+    (start_ts, id), `limit` (default DEFAULT_MEETINGS_PAGE_SIZE) meetings
+    per page, and `next_cursor` (None on the last page) fetches the
+    following page. `format=ndjson` streams the same meetings one per line
+    from a server-side cursor; a paged stream ends with a
+    `{"next_cursor": ...}` line.
+    
+    Supports conditional GET: the ETag changes when the user's meetings
+    change (or the window moves to the next minute), and a matching
+    If-None-Match gets 304 without querying meetings.
+    """
+    user = await AsyncUserRepository.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    start_date = datetime.utcnow() - timedelta(days=days)
-    end_date = datetime.utcnow() + timedelta(days=days)
+    after = _decode_meeting_cursor(cursor) if cursor else None
+    paged = limit is not None or cursor is not None
+    if paged and limit is None:
+        limit = DEFAULT_MEETINGS_PAGE_SIZE
+    
+    now = datetime.utcnow()
+    window = floor_time(now, 60)
+    etag = make_etag(
+        "meetings", user_id, user['change_version'], days, window.isoformat(),
+        cursor, limit, response_format
+    )
+    last_modified = max(user['changed_at'], window)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    
+    start_date = now - timedelta(days=days)
+    end_date = now + timedelta(days=days)
     
-    meetings = MeetingRepository.get_meetings_for_host(user_id, start_date, end_date)
+    # Fetch one extra row to know whether another page follows
+    fetch_limit = limit + 1 if paged else None
+    if response_format == "ndjson":
+        rows = AsyncMeetingRepository.stream_meetings_for_host(user_id, start_date, end_date, after, fetch_limit)
+        return StreamingResponse(
+            _ndjson_meetings(rows, limit),
+            media_type="application/x-ndjson",
+            headers=cache_headers(etag, last_modified)
+        )
+    
+    meetings = await AsyncMeetingRepository.get_meetings_for_host(user_id, start_date, end_date, after, fetch_limit)
+    
+    next_cursor = None
+    if paged and len(meetings) > limit:
+        meetings = meetings[:limit]
+        next_cursor = _encode_meeting_cursor(meetings[-1])
     
+    response.headers.update(cache_headers(etag, last_modified))
     return MeetingListResponse(
-        meetings=[
-            MeetingItem(
-                id=m['id'],
-                title=m['title'],
-                customer_name=m['customer_name'],
-                customer_email=m['customer_email'],
-                start_ts=m['start_ts'],
-                end_ts=m['end_ts'],
-                meet_link=m['meet_link']
-            )
-            for m in meetings
+        meetings=[MeetingItem(**m) for m in meetings],
+        next_cursor=next_cursor
+    )
+
+
+def _encode_meeting_cursor(meeting: dict) -> str:
+    """Opaque keyset cursor for the (start_ts, id) of the last meeting on a page."""
+    raw = f"{meeting['start_ts'].isoformat()}|{meeting['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_meeting_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_ts, meeting_id = raw.split("|")
+        return datetime.fromisoformat(start_ts), int(meeting_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _ndjson_meetings(rows: AsyncIterator[dict], limit: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Serialize streamed meeting rows as newline-delimited JSON. With a
+    limit, stop after `limit` rows and end with a {"next_cursor": ...}
+    line; rows holds one extra row if another page follows.
+    """
+    try:
+        count = 0
+        last = None
+        next_cursor = None
+        async for row in rows:
+            if count == limit:
+                next_cursor = _encode_meeting_cursor(last)
+                break
+            yield MeetingItem(**row).model_dump_json().encode() + b"\n"
+            last = row
+            count += 1
+        if limit is not None:
+            yield json.dumps({"next_cursor": next_cursor}).encode() + b"\n"
+    finally:
+        # Release the server-side cursor and connection if the client goes away
+        await rows.aclose()
+
+
+@router.get("/availability/team", response_model=TeamAvailabilityResponse)
+async def get_team_availability(
+    host_ids: List[int] = Query(..., description="Host IDs to combine"),
+    mode: str = Query(default="collective", pattern="^(collective|round_robin)$"),
+    days: int = Query(default=7, ge=1, le=30, description="Number of days to check")
+):
+    """
+    Get available time slots across several hosts.
+    
+    collective: slots where every host is free.
+    round_robin: slots where at least one host is free.
+    """
+    start_date = datetime.utcnow()
+    end_date = start_date + timedelta(days=days)
+    
+    try:
+        available_slots = await run_in_threadpool(
+            AvailabilityService.get_team_available_slots,
+            host_ids=host_ids,
+            start_date=start_date,
+            end_date=end_date,
+            mode=mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CalendarUnavailableError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get team availability: {str(e)}")
+    
+    return TeamAvailabilityResponse(
+        host_ids=host_ids,
+        mode=mode,
+        available_slots=[
+            TeamTimeSlot(start=s['start'], end=s['end'], host_ids=s.get('host_ids'))
+            for s in available_slots
         ]
     )
 
 
 @router.get("/availability/{host_id}", response_model=AvailabilityResponse)
 async def get_availability(
+    request: Request,
+    response: Response,
     host_id: int,
     days: int = Query(default=7, ge=1, le=30, description="Number of days to check")
 ):
@@ -57,52 +199,94 @@ async def get_availability(
     Get available time slots for a host.
     
     Returns available 30-minute slots within working hours (9 AM - 5 PM UTC)
-    for the next N days.
+    for the next N days. Supports conditional GET (ETag / Last-Modified).
     """
-    user = UserRepository.get_user_by_id(host_id)
+    user = await AsyncUserRepository.get_user_by_id(host_id)
     if not user:
         raise HTTPException(status_code=404, detail="Host not found")
     
+    return await _availability_for_user(request, response, user, days)
+
+
+@router.get("/availability/username/{username}", response_model=AvailabilityResponse)
+async def get_availability_by_username(
+    request: Request,
+    response: Response,
+    username: str,
+    days: int = Query(default=7, ge=1, le=30)
+):
+    """Get availability by username for the booking page."""
+    user = await AsyncUserRepository.get_user_by_username(username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return await _availability_for_user(request, response, user, days)
+
+
+def _availability_validators(user: dict, days: int) -> tuple:
+    """
+    ETag and Last-Modified for a host's availability.
+    
+    Folds the host's change_version (bookings, SMTP, tokens), this process's
+    Google free/busy generation for the host, the current slot (past slots
+    drop out) and the free/busy cache TTL window (external calendar edits).
+    """
+    now = datetime.utcnow()
+    slot_window = floor_time(now, AvailabilityService.DEFAULT_SLOT_DURATION * 60)
+    busy_window = floor_time(now, settings.GOOGLE_BUSY_CACHE_TTL)
+    generation, generation_at = GoogleCalendarService.busy_generation(user['id'])
+    
+    etag = make_etag(
+        "availability", user['id'], user['change_version'], generation,
+        days, slot_window.isoformat(), busy_window.isoformat()
+    )
+    last_modified = max(
+        t for t in (user['changed_at'], generation_at, slot_window, busy_window) if t is not None
+    )
+    return etag, last_modified
+
+
+async def _availability_for_user(request: Request, response: Response, user: dict, days: int):
+    """Availability response for a loaded host row, honouring conditional GET."""
     if not user.get('google_access_token'):
         raise HTTPException(
             status_code=400,
             detail="Host has not connected their Google Calendar"
         )
     
-    start_date = datetime.utcnow()
-    end_date = start_date + timedelta(days=days)
+    etag, last_modified = _availability_validators(user, days)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
     
-    try:
-        available_slots = AvailabilityService.get_available_slots(
-            host_id=host_id,
+    slot_duration = AvailabilityService.DEFAULT_SLOT_DURATION
+    
+    async def compute():
+        start_date = datetime.utcnow()
+        return await run_in_threadpool(
+            AvailabilityService.get_available_slots,
+            host_id=user['id'],
             start_date=start_date,
-            end_date=end_date
+            end_date=start_date + timedelta(days=days),
+            slot_duration_minutes=slot_duration
         )
+    
+    # The ETag pins the host's change version and the slot/free-busy windows,
+    # so a computation started before a booking is never shared after it
+    try:
+        available_slots = await availability_flights.do((user['id'], days, slot_duration, etag), compute)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get availability: {str(e)}")
     
+    response.headers.update(cache_headers(etag, last_modified))
     return AvailabilityResponse(
-        host_id=host_id,
+        host_id=user['id'],
         host_email=user['email'],
         available_slots=[TimeSlot(start=s['start'], end=s['end']) for s in available_slots]
     )
 
 
-@router.get("/availability/username/{username}", response_model=AvailabilityResponse)
-async def get_availability_by_username(
-    username: str,
-    days: int = Query(default=7, ge=1, le=30)
-):
-    """Get availability by username for the booking page."""
-    user = UserRepository.get_user_by_username(username)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return await get_availability(user['id'], days)
-
-
 @router.post("/book", response_model=BookingResponse)
 @limiter.limit("5/minute")
 async def book_meeting(request: Request, booking: BookingRequest):
@@ -110,28 +294,32 @@ async def book_meeting(request: Request, booking: BookingRequest):
     Book a meeting slot.
     
     This endpoint performs the following in order:
-    1. Validates and locks the slot using SELECT FOR UPDATE
+    1. Checks the slot for overlapping meetings
     2. Creates Google Calendar event with Meet link
     3. Saves meeting to database
-    4. Sends confirmation email
+    4. Queues confirmation emails in the email outbox
     5. Returns booking confirmation
     
     All operations are within a transaction - any failure rolls back.
+    Concurrent overlapping bookings are rejected by the meetings_no_overlap
+    exclusion constraint and returned as 409.
+    Emails are sent by the outbox worker once the meeting is committed.
     """
     try:
-        # Get host user
-        host = UserRepository.get_user_by_id(booking.host_id)
-        if not host:
+        # Host, Google tokens and active SMTP account in one query
+        context = await load_booking_context(booking.host_id)
+        if not context:
             raise HTTPException(status_code=404, detail="Host not found")
+        host = context.host
         
-        if not host.get('google_access_token'):
+        if not context.has_google:
             raise HTTPException(
                 status_code=400,
                 detail="Host has not connected their Google Calendar"
             )
         
         # Check if host has SMTP configured
-        if not EmailService.check_smtp_configured(booking.host_id):
+        if not context.has_smtp:
             raise HTTPException(
                 status_code=400,
                 detail="Host has not configured email settings. Please ask the host to set up SMTP in Email Settings."
@@ -158,9 +346,9 @@ async def book_meeting(request: Request, booking: BookingRequest):
             )
         
         # Start transaction
-        with get_db() as conn:
-            # Step 1: Lock and validate slot
-            is_available = MeetingRepository.check_slot_available(
+        async with get_async_db() as conn:
+            # Step 1: Validate slot (the exclusion constraint is the final guard)
+            is_available = await AsyncMeetingRepository.check_slot_available(
                 conn=conn,
                 host_id=booking.host_id,
                 start_ts=start_time,
@@ -175,13 +363,15 @@ async def book_meeting(request: Request, booking: BookingRequest):
             
             # Step 2: Create Google Calendar event with Meet link
             try:
-                calendar_result = GoogleCalendarService.create_calendar_event(
+                calendar_result = await run_in_threadpool(
+                    GoogleCalendarService.create_calendar_event,
                     user_id=booking.host_id,
                     summary=booking.title,
                     start_time=start_time,
                     end_time=end_time,
                     attendee_email=booking.customer_email,
-                    description=f"Meeting with {booking.customer_name}"
+                    description=f"Meeting with {booking.customer_name}",
+                    tokens=context.tokens
                 )
             except ValueError as e:
                 raise HTTPException(status_code=400, detail=str(e))
@@ -196,7 +386,7 @@ async def book_meeting(request: Request, booking: BookingRequest):
             
             # Step 3: Save meeting to database
             try:
-                meeting = MeetingRepository.create_meeting(
+                meeting = await AsyncMeetingRepository.create_meeting(
                     conn=conn,
                     host_id=booking.host_id,
                     customer_email=booking.customer_email,
@@ -207,44 +397,33 @@ async def book_meeting(request: Request, booking: BookingRequest):
                     meet_link=meet_link,
                     google_event_id=event_id
                 )
+                
+                # Step 4: Queue confirmation emails in the same transaction
+                for kind in (CUSTOMER_CONFIRMATION, HOST_NOTIFICATION):
+                    await AsyncEmailOutboxRepository.enqueue(
+                        conn, booking.host_id, meeting['id'], kind,
+                        meeting_email_payload(meeting, host['email'], kind)
+                    )
+            except ExclusionViolation:
+                # A concurrent booking took an overlapping slot first
+                await run_in_threadpool(
+                    GoogleCalendarService.delete_calendar_event, booking.host_id, event_id, context.tokens
+                )
+                raise HTTPException(
+                    status_code=409,
+                    detail="This time slot is no longer available"
+                )
             except Exception as e:
                 # Rollback: Delete the calendar event if DB save fails
-                GoogleCalendarService.delete_calendar_event(booking.host_id, event_id)
+                await run_in_threadpool(
+                    GoogleCalendarService.delete_calendar_event, booking.host_id, event_id, context.tokens
+                )
                 raise HTTPException(
                     status_code=500,
                     detail=f"Failed to save meeting: {str(e)}"
                 )
             
-            # Step 4: Send confirmation emails
-            # Send to customer
-            email_sent = EmailService.send_confirmation_email(
-                user_id=booking.host_id,
-                to_email=booking.customer_email,
-                customer_name=booking.customer_name,
-                host_email=host['email'],
-                meeting_title=booking.title,
-                start_time=start_time,
-                end_time=end_time,
-                meet_link=meet_link
-            )
-            
-            # Send notification to host
-            EmailService.send_host_notification(
-                user_id=booking.host_id,
-                host_email=host['email'],
-                customer_name=booking.customer_name,
-                customer_email=booking.customer_email,
-                meeting_title=booking.title,
-                start_time=start_time,
-                end_time=end_time,
-                meet_link=meet_link
-            )
-            
-            if not email_sent:
-                # Log warning but don't fail the booking
-                print(f"Warning: Failed to send confirmation email to {booking.customer_email}")
-            
-            # Step 5: Return response
+            # Step 5: Return response (emails are delivered by the outbox worker)
             return BookingResponse(
                 id=meeting['id'],
                 host_email=host['email'],
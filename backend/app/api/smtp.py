@@ -1,8 +1,4 @@
 from fastapi import APIRouter, HTTPException, Query, Request
-import smtplib
-from ssl import create_default_context
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from app.models.schemas import (
     SMTPAccountCreate,
@@ -11,11 +7,12 @@ from app.models.schemas import (
     SMTPTestRequest,
     SMTPTestResponse
 )
-from app.models.repositories import SMTPAccountRepository
+from app.models.async_repositories import AsyncSMTPAccountRepository
 from app.core.security import encrypt_token, decrypt_token
+from app.core.rate_limit import limiter
+from app.services.async_smtp import async_smtp
 
 router = APIRouter(prefix="/smtp", tags=["SMTP Management"])
-limiter = Limiter(key_func=get_remote_address)
 
 
 def mask_email(email: str) -> str:
@@ -32,34 +29,12 @@ def mask_email(email: str) -> str:
     return f"{masked_local}@{domain}"
 
 
-def test_smtp_connection(host: str, port: int, user: str, password: str) -> tuple[bool, str]:
+async def test_smtp_connection(host: str, port: int, user: str, password: str) -> tuple[bool, str]:
     """
     Test SMTP connection with provided credentials.
     Returns (success, message).
     """
-    try:
-        if port == 465:
-            # SSL connection
-            context = create_default_context()
-            with smtplib.SMTP_SSL(host, port, timeout=10, context=context) as server:
-                server.login(user, password)
-            return True, "SMTP connection successful (SSL)"
-        else:
-            # STARTTLS connection (587, 25, 2525)
-            with smtplib.SMTP(host, port, timeout=10) as server:
-                server.starttls()
-                server.login(user, password)
-            return True, "SMTP connection successful (STARTTLS)"
-    except smtplib.SMTPAuthenticationError:
-        return False, "Authentication failed. Check username and password."
-    except smtplib.SMTPConnectError:
-        return False, f"Could not connect to {host}:{port}"
-    except smtplib.SMTPServerDisconnected:
-        return False, "Server unexpectedly disconnected"
-    except TimeoutError:
-        return False, "Connection timed out"
-    except Exception as e:
-        return False, f"Connection failed: {str(e)}"
+    return await async_smtp.test_connection(host, port, user, password)
 
 
 @router.post("/add", response_model=SMTPAccountResponse)
@@ -76,7 +51,7 @@ async def add_smtp_account(
     
     # Create the account
     try:
-        account = SMTPAccountRepository.create_smtp_account(
+        account = await AsyncSMTPAccountRepository.create_smtp_account(
             user_id=user_id,
             smtp_host=smtp_data.smtp_host,
             smtp_port=smtp_data.smtp_port,
@@ -104,7 +79,7 @@ async def test_smtp_credentials(request: Request, smtp_data: SMTPTestRequest):
     Test SMTP credentials without saving.
     Rate limited to prevent abuse.
     """
-    success, message = test_smtp_connection(
+    success, message = await test_smtp_connection(
         host=smtp_data.smtp_host,
         port=smtp_data.smtp_port,
         user=smtp_data.smtp_user,
@@ -124,12 +99,12 @@ async def set_smtp_active(
     Only one account can be active per user.
     """
     # Verify account exists and belongs to user
-    account = SMTPAccountRepository.get_smtp_account_by_id(smtp_id, user_id)
+    account = await AsyncSMTPAccountRepository.get_smtp_account_by_id(smtp_id, user_id)
     if not account:
         raise HTTPException(status_code=404, detail="SMTP account not found")
     
     # Set as active
-    success = SMTPAccountRepository.set_smtp_active(smtp_id, user_id)
+    success = await AsyncSMTPAccountRepository.set_smtp_active(smtp_id, user_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to set SMTP account as active")
     
@@ -142,7 +117,7 @@ async def list_smtp_accounts(user_id: int = Query(..., description="User ID")):
     List all SMTP accounts for a user.
     Passwords are never returned, emails are masked.
     """
-    accounts = SMTPAccountRepository.get_smtp_accounts_for_user(user_id)
+    accounts = await AsyncSMTPAccountRepository.get_smtp_accounts_for_user(user_id)
     
     return SMTPAccountListResponse(
         accounts=[
@@ -166,11 +141,11 @@ async def delete_smtp_account(
 ):
     """Delete an SMTP account."""
     # Verify account exists and belongs to user
-    account = SMTPAccountRepository.get_smtp_account_by_id(smtp_id, user_id)
+    account = await AsyncSMTPAccountRepository.get_smtp_account_by_id(smtp_id, user_id)
     if not account:
         raise HTTPException(status_code=404, detail="SMTP account not found")
     
-    success = SMTPAccountRepository.delete_smtp_account(smtp_id, user_id)
+    success = await AsyncSMTPAccountRepository.delete_smtp_account(smtp_id, user_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete SMTP account")
     
@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction.
+    
+    Entries can carry a version (e.g. users.change_version); a get with a
+    different version is a miss, so a row changed by another worker is
+    never served from here. Like StaleWhileRevalidateCache, every
+    invalidation bumps an epoch, and a set made with an epoch captured
+    before the read is dropped if an invalidation happened in between.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple[float, Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def epoch(self) -> int:
+        """Current invalidation epoch; capture it before reading the source."""
+        with self._lock:
+            return self._epoch
+    
+    def get(self, key: Hashable, version: Any = None) -> Optional[Any]:
+        """Return the cached value, or None if missing, expired or of another version."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_version, value = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, version: Any = None, epoch: Optional[int] = None):
+        """
+        Store a value, evicting the least recently used entry when full.
+        Skipped if epoch is given and the cache was invalidated since.
+        """
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._data[key] = (time.monotonic() + self.ttl_seconds, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, key: Hashable):
+        """Drop a single entry."""
+        with self._lock:
+            self._epoch += 1
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+    
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class StaleWhileRevalidateCache:
+    """
+    TTL cache that keeps serving an expired entry for a grace period while
+    a background thread reloads it.
+    
+    Entries younger than ttl_seconds are fresh. Entries younger than
+    ttl_seconds + stale_seconds are returned immediately and refreshed in the
+    background; anything older is reloaded inline.
+    """
+    
+    def __init__(self, ttl_seconds: float, stale_seconds: float, max_size: int, max_workers: int = 2):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="swr-refresh")
+        # Bumped on every invalidation so in-flight refreshes can't resurrect evicted data
+        self._epoch = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading or refreshing it as needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, loader, self._epoch)
+                    return entry[1]
+            self.misses += 1
+            epoch = self._epoch
+        
+        value = loader()
+        self._store(key, value, epoch)
+        return value
+    
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh entry without loading; counts as a hit or miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a value loaded outside get_or_load (e.g. by a batch fetch)."""
+        with self._lock:
+            epoch = self._epoch
+        self._store(key, value, epoch)
+    
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], epoch: int):
+        try:
+            value = loader()
+            self._store(key, value, epoch)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"Background cache refresh failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def _store(self, key: Hashable, value: Any, epoch: int):
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop every entry whose key matches predicate."""
+        with self._lock:
+            self._epoch += 1
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+    
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+    
+    def stats(self) -> dict:
+        """Return size and hit/miss/refresh counters."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+
+# Decrypted credentials, keyed by user id and versioned by users.change_version
+google_token_cache = TTLCache(
+    ttl_seconds=settings.CREDENTIAL_CACHE_TTL,
+    max_size=settings.CREDENTIAL_CACHE_MAX_SIZE
+)
+smtp_credentials_cache = TTLCache(
+    ttl_seconds=settings.CREDENTIAL_CACHE_TTL,
+    max_size=settings.CREDENTIAL_CACHE_MAX_SIZE
+)
+
+# Google free/busy results, keyed by (host_id, window_start, window_end)
+google_busy_cache = StaleWhileRevalidateCache(
+    ttl_seconds=settings.GOOGLE_BUSY_CACHE_TTL,
+    stale_seconds=settings.GOOGLE_BUSY_CACHE_STALE_TTL,
+    max_size=settings.GOOGLE_BUSY_CACHE_MAX_SIZE
+)
@@ -8,6 +8,13 @@ class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     
+    # Database connection pool
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+    DB_POOL_MAX_IDLE: float = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+    
     # Google OAuth
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
@@ -19,8 +26,61 @@ class Settings:
     SMTP_USER: str = os.getenv("SMTP_USER", "")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     
+    # Pooled SMTP sessions: idle keep-alive (seconds) and concurrent sessions per provider host
+    SMTP_POOL_IDLE_TIMEOUT: float = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "60"))
+    SMTP_POOL_MAX_PER_HOST: int = int(os.getenv("SMTP_POOL_MAX_PER_HOST", "4"))
+    # Deadline (seconds) for one async SMTP send, including waiting for a session
+    SMTP_SEND_TIMEOUT: float = float(os.getenv("SMTP_SEND_TIMEOUT", "30"))
+    
     # Security
     ENCRYPTION_KEY: str = os.getenv("ENCRYPTION_KEY", "")
+    # Comma-separated keys that are still accepted for decryption during rotation
+    ENCRYPTION_PREVIOUS_KEYS: list = [
+        k.strip() for k in os.getenv("ENCRYPTION_PREVIOUS_KEYS", "").split(",") if k.strip()
+    ]
+    
+    # In-process cache of decrypted Google/SMTP credentials
+    CREDENTIAL_CACHE_TTL: float = float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+    CREDENTIAL_CACHE_MAX_SIZE: int = int(os.getenv("CREDENTIAL_CACHE_MAX_SIZE", "1024"))
+    
+    # Load the Google client libraries in the background at startup; set false
+    # for workers that never call Google (they are then imported on first use)
+    GOOGLE_CLIENT_PRELOAD: bool = os.getenv("GOOGLE_CLIENT_PRELOAD", "true").lower() == "true"
+    
+    # Background renewal of Google access tokens expiring within LEAD seconds,
+    # checked every INTERVAL seconds
+    GOOGLE_TOKEN_REFRESHER_ENABLED: bool = os.getenv("GOOGLE_TOKEN_REFRESHER_ENABLED", "true").lower() == "true"
+    GOOGLE_TOKEN_REFRESH_INTERVAL: float = float(os.getenv("GOOGLE_TOKEN_REFRESH_INTERVAL", "60"))
+    GOOGLE_TOKEN_REFRESH_LEAD: float = float(os.getenv("GOOGLE_TOKEN_REFRESH_LEAD", "600"))
+    
+    # Google free/busy cache (seconds); windows are aligned to WINDOW_MINUTES
+    GOOGLE_BUSY_CACHE_TTL: float = float(os.getenv("GOOGLE_BUSY_CACHE_TTL", "60"))
+    GOOGLE_BUSY_CACHE_STALE_TTL: float = float(os.getenv("GOOGLE_BUSY_CACHE_STALE_TTL", "300"))
+    GOOGLE_BUSY_CACHE_MAX_SIZE: int = int(os.getenv("GOOGLE_BUSY_CACHE_MAX_SIZE", "2048"))
+    GOOGLE_BUSY_CACHE_WINDOW_MINUTES: int = int(os.getenv("GOOGLE_BUSY_CACHE_WINDOW_MINUTES", "15"))
+    
+    # Email outbox worker
+    OUTBOX_WORKER_ENABLED: bool = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+    OUTBOX_LEASE_SECONDS: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BACKOFF_BASE: float = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))
+    OUTBOX_BACKOFF_MAX: float = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+    
+    # Materialized per-host free slots (default slot duration only)
+    FREE_SLOT_STORE_ENABLED: bool = os.getenv("FREE_SLOT_STORE_ENABLED", "true").lower() == "true"
+    FREE_SLOT_HORIZON_DAYS: int = int(os.getenv("FREE_SLOT_HORIZON_DAYS", "30"))
+    # Seconds between background reconciliations against Google busy data
+    FREE_SLOT_REFRESH_INTERVAL: float = float(os.getenv("FREE_SLOT_REFRESH_INTERVAL", "300"))
+    # Days refreshed longer ago than this are recomputed on read
+    FREE_SLOT_MAX_AGE: float = float(os.getenv("FREE_SLOT_MAX_AGE", "900"))
+    
+    # Rate limiting: shared counter store for every worker, e.g.
+    # batched+redis://localhost:6379 (memory:// keeps counters per process)
+    RATE_LIMIT_STORAGE_URI: str = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    # batched+ stores: share of the remaining budget a process leases per round trip
+    RATE_LIMIT_LOCAL_SHARE: float = float(os.getenv("RATE_LIMIT_LOCAL_SHARE", "0.1"))
     
     # App URLs
     APP_URL: str = os.getenv("APP_URL", "http://localhost:8000")
@@ -1,19 +1,69 @@
+import asyncio
+import threading
+import time
 import psycopg
 from psycopg.rows import dict_row
-from contextlib import contextmanager
-from typing import Generator
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from contextlib import contextmanager, asynccontextmanager
+from typing import AsyncGenerator, Generator, Optional
 from app.core.config import settings
+from app.core.migrations import LATEST_VERSION, apply_migrations, schema_version
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+_async_pool: Optional[AsyncConnectionPool] = None
+_async_pool_lock: Optional[asyncio.Lock] = None
 
 
 def get_connection():
-    """Create a new database connection."""
+    """Create a new, unpooled database connection."""
     return psycopg.connect(settings.DATABASE_URL, row_factory=dict_row)
 
 
+def get_pool() -> ConnectionPool:
+    """Get the shared connection pool, opening it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    conninfo=settings.DATABASE_URL,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                    max_idle=settings.DB_POOL_MAX_IDLE,
+                    kwargs={"row_factory": dict_row},
+                    check=ConnectionPool.check_connection,
+                    name="meets",
+                    open=True,
+                )
+    return _pool
+
+
+def close_pool():
+    """Close the shared connection pool (called on shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool statistics (size, idle, waiting, errors...)."""
+    if _pool is None:
+        return {}
+    return _pool.get_stats()
+
+
 @contextmanager
 def get_db() -> Generator:
-    """Context manager for database connections with automatic commit/rollback."""
-    conn = get_connection()
+    """Context manager for pooled database connections with automatic commit/rollback."""
+    pool = get_pool()
+    conn = pool.getconn()
     try:
         yield conn
         conn.commit()
@@ -21,7 +71,7 @@ def get_db() -> Generator:
         conn.rollback()
         raise e
     finally:
-        conn.close()
+        pool.putconn(conn)
 
 
 @contextmanager
@@ -35,97 +85,101 @@ def get_db_cursor() -> Generator:
             cursor.close()
 
 
+async def get_async_pool() -> AsyncConnectionPool:
+    """Get the shared async connection pool, opening it on first use."""
+    global _async_pool, _async_pool_lock
+    if _async_pool is None:
+        if _async_pool_lock is None:
+            _async_pool_lock = asyncio.Lock()
+        async with _async_pool_lock:
+            if _async_pool is None:
+                pool = AsyncConnectionPool(
+                    conninfo=settings.DATABASE_URL,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                    max_idle=settings.DB_POOL_MAX_IDLE,
+                    kwargs={"row_factory": dict_row},
+                    check=AsyncConnectionPool.check_connection,
+                    name="meets-async",
+                    open=False,
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
+
+async def close_async_pool():
+    """Close the shared async connection pool (called on shutdown)."""
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
+def get_async_pool_stats() -> dict:
+    """Return async connection pool statistics."""
+    if _async_pool is None:
+        return {}
+    return _async_pool.get_stats()
+
+
+@asynccontextmanager
+async def get_async_db() -> AsyncGenerator:
+    """Async twin of get_db(): pooled connection with automatic commit/rollback."""
+    pool = await get_async_pool()
+    conn = await pool.getconn()
+    try:
+        yield conn
+        await conn.commit()
+    except Exception as e:
+        await conn.rollback()
+        raise e
+    finally:
+        await pool.putconn(conn)
+
+
+async def ping_async_db(timeout: float = 5.0) -> float:
+    """
+    Run SELECT 1 on a pooled connection, waiting at most `timeout` seconds
+    (including for a free connection). Returns the round trip in seconds.
+    """
+    async def ping():
+        async with get_async_db() as conn:
+            await conn.execute("SELECT 1")
+    
+    start = time.perf_counter()
+    await asyncio.wait_for(ping(), timeout=timeout)
+    return time.perf_counter() - start
+
+
+@asynccontextmanager
+async def get_async_db_cursor() -> AsyncGenerator:
+    """Async twin of get_db_cursor()."""
+    async with get_async_db() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            await cursor.close()
+
+
 def init_db():
-    """Initialize database tables."""
+    """
+    Bring the schema up to date (see app.core.migrations).
+    
+    A single version query when the database is current; otherwise pending
+    migrations are applied once under an advisory lock.
+    """
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                google_access_token TEXT,
-                google_refresh_token TEXT,
-                token_expiry TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create meetings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS meetings (
-                id SERIAL PRIMARY KEY,
-                host_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                customer_email TEXT NOT NULL,
-                customer_name TEXT,
-                title TEXT NOT NULL,
-                start_ts TIMESTAMP NOT NULL,
-                end_ts TIMESTAMP NOT NULL,
-                meet_link TEXT NOT NULL,
-                google_event_id TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT no_overlapping_meetings UNIQUE (host_id, start_ts, end_ts)
-            )
-        """)
-        
-        # Create index for faster availability queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_meetings_host_time 
-            ON meetings(host_id, start_ts, end_ts)
-        """)
-        
-        # Create SMTP accounts table (user-managed)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS smtp_accounts (
-                id SERIAL PRIMARY KEY,
-                user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                smtp_host TEXT NOT NULL,
-                smtp_port INT NOT NULL,
-                smtp_user TEXT NOT NULL,
-                smtp_password TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT false,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create index for faster user SMTP lookups
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_smtp_accounts_user 
-            ON smtp_accounts(user_id)
-        """)
-        
-        # Create trigger function to ensure only one active SMTP per user
-        cursor.execute("""
-            CREATE OR REPLACE FUNCTION ensure_single_active_smtp()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                IF NEW.is_active = true THEN
-                    UPDATE smtp_accounts 
-                    SET is_active = false 
-                    WHERE user_id = NEW.user_id AND id != NEW.id;
-                END IF;
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql
-        """)
-        
-        # Create trigger
-        cursor.execute("""
-            DROP TRIGGER IF EXISTS trigger_single_active_smtp ON smtp_accounts
-        """)
-        cursor.execute("""
-            CREATE TRIGGER trigger_single_active_smtp
-                BEFORE INSERT OR UPDATE ON smtp_accounts
-                FOR EACH ROW
-                EXECUTE FUNCTION ensure_single_active_smtp()
-        """)
-        
-        cursor.close()
-        print("Database tables initialized successfully.")
+        if schema_version(conn) >= LATEST_VERSION:
+            return
+        applied = apply_migrations(conn)
+    if applied:
+        print(f"Database migrated to version {LATEST_VERSION}.")
 
 
 if __name__ == "__main__":
     init_db()
+    close_pool()
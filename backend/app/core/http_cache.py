@@ -0,0 +1,58 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+
+_EPOCH = datetime(2000, 1, 1)
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the values a representation depends on."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def floor_time(value: datetime, seconds: float) -> datetime:
+    """Start of the `seconds`-long bucket containing a naive-UTC datetime."""
+    step = timedelta(seconds=max(int(seconds), 1))
+    return _EPOCH + ((value - _EPOCH) // step) * step
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    """Validator headers; clients must revalidate before reusing a copy."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluate If-None-Match (weak comparison) or, when absent,
+    If-Modified-Since against the current validators.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    
+    return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    """Empty 304 carrying the current validators."""
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
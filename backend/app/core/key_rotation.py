@@ -0,0 +1,66 @@
+"""
+Re-encrypt stored secrets under the current ENCRYPTION_KEY.
+
+Rotating keys is a three-step process:
+  1. Set ENCRYPTION_KEY to the new key and move the old one to
+     ENCRYPTION_PREVIOUS_KEYS; tokens encrypted with it still decrypt.
+  2. Run this command once (any number of times is safe):
+         python -m app.core.key_rotation
+  3. Remove the old key from ENCRYPTION_PREVIOUS_KEYS.
+
+Rows are rewritten in batches with a compare-and-set on the old value, so
+a token updated concurrently (e.g. by an OAuth refresh) is left alone.
+"""
+from typing import Dict, Tuple
+from app.core.database import get_db
+from app.core.security import needs_rotation, rotate_token
+
+
+# (table, column) pairs holding encrypt_token() output
+ENCRYPTED_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("users", "google_access_token"),
+    ("users", "google_refresh_token"),
+    ("smtp_accounts", "smtp_password"),
+)
+
+BATCH_SIZE = 500
+
+
+def rotate_column(table: str, column: str, batch_size: int = BATCH_SIZE) -> int:
+    """Re-encrypt one column's values that use a previous key. Returns rows rewritten."""
+    rotated = 0
+    last_id = 0
+    while True:
+        with get_db() as conn:
+            rows = conn.execute(
+                f"SELECT id, {column} AS value FROM {table} "
+                f"WHERE id > %s AND {column} IS NOT NULL AND {column} <> '' "
+                f"ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            ).fetchall()
+            for row in rows:
+                if not needs_rotation(row['value']):
+                    continue
+                cursor = conn.execute(
+                    f"UPDATE {table} SET {column} = %s WHERE id = %s AND {column} = %s",
+                    (rotate_token(row['value']), row['id'], row['value'])
+                )
+                rotated += cursor.rowcount
+        if len(rows) < batch_size:
+            return rotated
+        last_id = rows[-1]['id']
+
+
+def rotate_all() -> Dict[str, int]:
+    """Re-encrypt every encrypted column. Returns rows rewritten per table.column."""
+    return {
+        f"{table}.{column}": rotate_column(table, column)
+        for table, column in ENCRYPTED_COLUMNS
+    }
+
+
+if __name__ == "__main__":
+    from app.core.database import close_pool
+    for name, count in rotate_all().items():
+        print(f"Re-encrypted {count} value(s) in {name}")
+    close_pool()
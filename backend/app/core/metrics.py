@@ -0,0 +1,193 @@
+import inspect
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+
+# Latency buckets (seconds) shared by HTTP, Google and SMTP timings
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Database queries are mostly sub-millisecond to tens of milliseconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "meets_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "meets_db_query_duration_seconds",
+    "Repository method latency",
+    ["repository", "method"],
+    buckets=QUERY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter(
+    "meets_db_query_errors_total",
+    "Repository method calls that raised",
+    ["repository", "method"]
+)
+GOOGLE_CALL_SECONDS = Histogram(
+    "meets_google_call_duration_seconds",
+    "Google API call latency by operation",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+GOOGLE_CALL_ERRORS = Counter(
+    "meets_google_call_errors_total",
+    "Google API calls that raised, by operation",
+    ["operation"]
+)
+SMTP_SEND_SECONDS = Histogram(
+    "meets_smtp_send_duration_seconds",
+    "SMTP send latency by engine",
+    ["engine"],
+    buckets=LATENCY_BUCKETS
+)
+SMTP_SEND_ERRORS = Counter(
+    "meets_smtp_send_errors_total",
+    "SMTP sends that raised, by engine",
+    ["engine"]
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, errors: Counter, *labels):
+    """Time a block into `histogram` and count it in `errors` if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.labels(*labels).inc()
+        raise
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+def google_call(operation: str):
+    """Time a Google API call, e.g. `with google_call("freebusy.query"): ...`."""
+    return observe(GOOGLE_CALL_SECONDS, GOOGLE_CALL_ERRORS, operation)
+
+
+def smtp_send(engine: str):
+    """Time an SMTP send, labelled by engine (e.g. "async")."""
+    return observe(SMTP_SEND_SECONDS, SMTP_SEND_ERRORS, engine)
+
+
+def timed_repository(cls):
+    """
+    Class decorator timing every public static method of a repository into
+    DB_QUERY_SECONDS. Label children are bound once here, so a call costs
+    two perf_counter reads and one histogram observe.
+    Async generators (streaming queries) are left as they are.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attr, staticmethod):
+            continue
+        func = attr.__func__
+        if inspect.isasyncgenfunction(func):
+            continue
+        setattr(cls, name, staticmethod(_timed(func, cls.__name__, name)))
+    return cls
+
+
+def _timed(func: Callable, repository: str, method: str) -> Callable:
+    seconds = DB_QUERY_SECONDS.labels(repository, method)
+    errors = DB_QUERY_ERRORS.labels(repository, method)
+    
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+        return timed_async
+    
+    @wraps(func)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - start)
+    return timed
+
+
+class RuntimeStatsCollector:
+    """
+    Exposes the numeric fields of registered stats() callables (pools,
+    caches, SMTP sessions) as gauges, read only when /metrics is scraped.
+    """
+    
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], dict]] = {}
+    
+    def register(self, source: str, stats: Callable[[], dict]):
+        self._sources[source] = stats
+    
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "meets_runtime_stat",
+            "Pool, cache and session statistics",
+            labels=["source", "stat"]
+        )
+        for source, stats in self._sources.items():
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Metrics: stats for {source} failed: {str(e)}")
+                continue
+            for stat, value in values.items():
+                if isinstance(value, (int, float)):
+                    gauge.add_metric([source, stat], float(value))
+        yield gauge
+
+
+runtime_stats = RuntimeStatsCollector()
+REGISTRY.register(runtime_stats)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template
+    (e.g. /availability/{host_id}), so path parameters don't create new
+    series. Requests that match no route are recorded as "unmatched".
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> tuple:
+    """(body, content type) of the Prometheus text exposition."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,344 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_migrations. Workers check the recorded version on startup (one
+query) and only take the migration advisory lock when they are behind,
+so booting against an up-to-date database issues no DDL.
+
+Migrations are written idempotently (IF NOT EXISTS, CREATE OR REPLACE)
+because databases created by the old init_db, or from schema.sql, already
+contain some or all of these objects but have no schema_migrations rows.
+
+Apply pending migrations explicitly (e.g. as a deploy step):
+    python -m app.core.migrations
+"""
+from typing import List, NamedTuple
+from psycopg.errors import UndefinedTable
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: List[str]
+
+
+# Session advisory lock serializing migration runs across workers and nodes
+MIGRATION_LOCK_KEY = 0x6D656574_73000001
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            google_access_token TEXT,
+            google_refresh_token TEXT,
+            token_expiry TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS meetings (
+            id SERIAL PRIMARY KEY,
+            host_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            customer_email TEXT NOT NULL,
+            customer_name TEXT,
+            title TEXT NOT NULL,
+            start_ts TIMESTAMP NOT NULL,
+            end_ts TIMESTAMP NOT NULL,
+            meet_link TEXT NOT NULL,
+            google_event_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Faster availability queries
+        """
+        CREATE INDEX IF NOT EXISTS idx_meetings_host_time
+        ON meetings(host_id, start_ts, end_ts)
+        """,
+        # User-managed SMTP accounts
+        """
+        CREATE TABLE IF NOT EXISTS smtp_accounts (
+            id SERIAL PRIMARY KEY,
+            user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            smtp_host TEXT NOT NULL,
+            smtp_port INT NOT NULL,
+            smtp_user TEXT NOT NULL,
+            smtp_password TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT false,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_smtp_accounts_user
+        ON smtp_accounts(user_id)
+        """,
+        # Only one active SMTP account per user
+        """
+        CREATE OR REPLACE FUNCTION ensure_single_active_smtp()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.is_active = true THEN
+                UPDATE smtp_accounts
+                SET is_active = false
+                WHERE user_id = NEW.user_id AND id != NEW.id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trigger_single_active_smtp ON smtp_accounts",
+        """
+        CREATE TRIGGER trigger_single_active_smtp
+            BEFORE INSERT OR UPDATE ON smtp_accounts
+            FOR EACH ROW
+            EXECUTE FUNCTION ensure_single_active_smtp()
+        """,
+    ]),
+    Migration(2, "email_outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            meeting_id INT REFERENCES meetings(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+        ON email_outbox(next_attempt_at) WHERE status = 'pending'
+        """,
+    ]),
+    Migration(3, "meetings_overlap_exclusion", [
+        # btree_gist lets the exclusion constraint combine host_id (=) with ranges (&&)
+        "CREATE EXTENSION IF NOT EXISTS btree_gist",
+        # Existing overlaps would make the constraint fail with an opaque
+        # error; stop with the conflicting meetings listed instead
+        """
+        DO $$
+        DECLARE
+            conflicts TEXT;
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'meetings_no_overlap'
+            ) THEN
+                RETURN;
+            END IF;
+            SELECT string_agg(pair, E'\\n') INTO conflicts FROM (
+                SELECT format(
+                    'host %s: meeting %s (%s - %s) overlaps meeting %s (%s - %s)',
+                    a.host_id, a.id, a.start_ts, a.end_ts, b.id, b.start_ts, b.end_ts
+                ) AS pair
+                FROM meetings a
+                JOIN meetings b ON b.host_id = a.host_id AND b.id > a.id
+                AND tsrange(a.start_ts, a.end_ts) && tsrange(b.start_ts, b.end_ts)
+                ORDER BY a.host_id, a.start_ts, a.id, b.id
+                LIMIT 100
+            ) pairs;
+            IF conflicts IS NOT NULL THEN
+                RAISE EXCEPTION E'meetings_no_overlap cannot be added, overlapping meetings exist (first 100 pairs):\\n%', conflicts
+                    USING HINT = 'Cancel or move one meeting of each pair, then run python -m app.core.migrations';
+            END IF;
+        END
+        $$
+        """,
+        # Replaces the exact-duplicate UNIQUE constraint
+        "ALTER TABLE meetings DROP CONSTRAINT IF EXISTS no_overlapping_meetings",
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'meetings_no_overlap'
+            ) THEN
+                ALTER TABLE meetings ADD CONSTRAINT meetings_no_overlap EXCLUDE USING gist (
+                    host_id WITH =,
+                    tsrange(start_ts, end_ts) WITH &&
+                );
+            END IF;
+        END
+        $$
+        """,
+    ]),
+    Migration(4, "free_slot_store", [
+        # One row per host/day that has been computed, plus that day's free slots
+        """
+        CREATE TABLE IF NOT EXISTS host_slot_days (
+            host_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            slot_date DATE NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (host_id, slot_date)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS host_free_slots (
+            host_id INT NOT NULL,
+            slot_date DATE NOT NULL,
+            start_ts TIMESTAMP NOT NULL,
+            end_ts TIMESTAMP NOT NULL,
+            PRIMARY KEY (host_id, start_ts),
+            FOREIGN KEY (host_id, slot_date)
+                REFERENCES host_slot_days(host_id, slot_date) ON DELETE CASCADE
+        )
+        """,
+        # A new meeting removes the slots it overlaps; a removed or moved
+        # meeting sends its days back for recomputation. The per-host
+        # advisory lock serializes this with slot refreshes.
+        """
+        CREATE OR REPLACE FUNCTION sync_host_free_slots()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                PERFORM pg_advisory_xact_lock(hashtext('host_free_slots'), OLD.host_id);
+                DELETE FROM host_slot_days
+                WHERE host_id = OLD.host_id
+                AND slot_date BETWEEN OLD.start_ts::date AND OLD.end_ts::date;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM pg_advisory_xact_lock(hashtext('host_free_slots'), NEW.host_id);
+                DELETE FROM host_free_slots
+                WHERE host_id = NEW.host_id
+                AND tsrange(start_ts, end_ts) && tsrange(NEW.start_ts, NEW.end_ts);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trigger_sync_host_free_slots ON meetings",
+        """
+        CREATE TRIGGER trigger_sync_host_free_slots
+            AFTER INSERT OR UPDATE OR DELETE ON meetings
+            FOR EACH ROW
+            EXECUTE FUNCTION sync_host_free_slots()
+        """,
+    ]),
+    Migration(5, "user_change_version", [
+        # Per-host change version for ETags
+        """
+        ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS changed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        """,
+        # Bumped when a user's meetings or SMTP accounts change; TG_ARGV[0]
+        # names the user id column
+        """
+        CREATE OR REPLACE FUNCTION bump_user_change_version()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            changed JSONB;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := to_jsonb(OLD);
+            ELSE
+                changed := to_jsonb(NEW);
+            END IF;
+            UPDATE users
+            SET change_version = change_version + 1,
+                changed_at = now() AT TIME ZONE 'utc'
+            WHERE id = (changed ->> TG_ARGV[0])::int;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trigger_meetings_change_version ON meetings",
+        """
+        CREATE TRIGGER trigger_meetings_change_version
+            AFTER INSERT OR UPDATE OR DELETE ON meetings
+            FOR EACH ROW
+            EXECUTE FUNCTION bump_user_change_version('host_id')
+        """,
+        "DROP TRIGGER IF EXISTS trigger_smtp_accounts_change_version ON smtp_accounts",
+        """
+        CREATE TRIGGER trigger_smtp_accounts_change_version
+            AFTER INSERT OR UPDATE OR DELETE ON smtp_accounts
+            FOR EACH ROW
+            EXECUTE FUNCTION bump_user_change_version('user_id')
+        """,
+    ]),
+    Migration(6, "meetings_keyset_index", [
+        # Keyset pagination of meeting lists on (start_ts, id)
+        """
+        CREATE INDEX IF NOT EXISTS idx_meetings_host_start_id
+        ON meetings(host_id, start_ts, id)
+        """,
+    ]),
+    Migration(7, "users_token_expiry_index", [
+        # Background refresher scan for tokens about to expire
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_token_expiry
+        ON users(token_expiry) WHERE google_refresh_token IS NOT NULL
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(conn) -> int:
+    """Highest applied migration, or 0 if schema_migrations doesn't exist yet."""
+    try:
+        row = conn.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations").fetchone()
+        version = row['version']
+    except UndefinedTable:
+        version = 0
+    conn.rollback()
+    return version
+
+
+def apply_migrations(conn) -> List[int]:
+    """
+    Apply pending migrations under the migration advisory lock, committing
+    each one with its schema_migrations row. Workers that lose the race for
+    the lock wait, then find nothing left to do. Returns applied versions.
+    """
+    conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    applied_now = []
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+            )
+        """)
+        applied = {row['version'] for row in conn.execute("SELECT version FROM schema_migrations").fetchall()}
+        conn.commit()
+        
+        for migration in MIGRATIONS:
+            if migration.version in applied:
+                continue
+            try:
+                for statement in migration.statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name)
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Migration {migration.version:04d}_{migration.name} failed: {str(e)}")
+                raise
+            applied_now.append(migration.version)
+            print(f"Applied migration {migration.version:04d}_{migration.name}")
+    finally:
+        conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+    return applied_now
+
+
+if __name__ == "__main__":
+    from app.core.database import close_pool, init_db
+    init_db()
+    close_pool()
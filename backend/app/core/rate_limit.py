@@ -0,0 +1,176 @@
+import threading
+import time
+from typing import Dict, Optional
+from limits.storage import Storage, storage_from_string
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from app.core.config import settings
+
+
+BATCHED_PREFIX = "batched+"
+
+
+class _Window:
+    """Local view of one fixed-window counter."""
+    __slots__ = ("expires_at", "shared", "tokens", "synced")
+    
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.shared = 0
+        self.tokens = 0
+        self.synced = False
+
+
+class BatchedStorage(Storage):
+    """
+    limits storage that fronts a shared store (Redis, Memcached, or memory
+    for tests) with per-process leases, selected with a "batched+" URI
+    prefix, e.g. batched+redis://localhost:6379.
+    
+    Per fixed-window key, a process that has to go to the shared store
+    increments it by the hit plus a lease of `local_share` of the remaining
+    budget, then admits that many later hits locally. Leased hits are
+    counted in the shared store up front, so workers together never admit
+    more than the limit; the cost is that unused leases expire with the
+    window. Close to the limit the lease shrinks to zero and every hit goes
+    to the shared store. Once the shared count reaches the limit and the
+    lease is spent, hits are rejected locally until the window ends.
+    
+    The limit is read from the limits key (".../<amount>/<multiples>/<granularity>");
+    keys it can't parse are passed straight through.
+    """
+    
+    STORAGE_SCHEME = [
+        BATCHED_PREFIX + scheme
+        for scheme in ("memory", "redis", "rediss", "redis+unix", "redis+cluster", "redis+sentinel", "memcached")
+    ]
+    
+    # Prune expired local windows once this many keys are tracked
+    MAX_LOCAL_KEYS = 4096
+    
+    def __init__(self, uri: str, wrap_exceptions: bool = False, local_share: float = 0.1, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        self.inner = storage_from_string(uri[len(BATCHED_PREFIX):], wrap_exceptions=wrap_exceptions, **options)
+        self.local_share = float(local_share)
+        self._windows: Dict[str, _Window] = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.local_rejects = 0
+        self.syncs = 0
+    
+    @property
+    def base_exceptions(self):
+        return self.inner.base_exceptions
+    
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        limit = self._limit_from_key(key)
+        if limit is None:
+            return self.inner.incr(key, expiry, amount)
+        
+        with self._lock:
+            window = self._window(key, expiry)
+            if window.tokens >= amount:
+                window.tokens -= amount
+                self.local_hits += 1
+                return min(window.shared, limit) - window.tokens
+            if window.synced and window.shared >= limit:
+                self.local_rejects += 1
+                return window.shared + amount
+            lease = int(max(limit - window.shared - amount, 0) * self.local_share)
+            first_sync = not window.synced
+        
+        request = amount + lease
+        total = self.inner.incr(key, expiry, request)
+        # Hits of this request that still fit under the limit
+        usable = min(request, max(limit - (total - request), 0))
+        expires_at = None
+        if first_sync:
+            # End the local window when the shared one does
+            expires_at = time.monotonic() + max(self.inner.get_expiry(key) - time.time(), 0)
+        
+        with self._lock:
+            self.syncs += 1
+            window.shared = max(window.shared, total)
+            window.synced = True
+            if expires_at is not None:
+                window.expires_at = expires_at
+            if usable < amount:
+                window.tokens += usable
+                return total
+            window.tokens += usable - amount
+            return min(window.shared, limit) - window.tokens
+    
+    def get(self, key: str) -> int:
+        limit = self._limit_from_key(key)
+        with self._lock:
+            window = self._windows.get(key)
+            if limit is not None and window is not None and window.synced and time.monotonic() < window.expires_at:
+                return min(window.shared, limit) - window.tokens
+        return self.inner.get(key)
+    
+    def get_expiry(self, key: str) -> float:
+        return self.inner.get_expiry(key)
+    
+    def check(self) -> bool:
+        return self.inner.check()
+    
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            self._windows.clear()
+        return self.inner.reset()
+    
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+        self.inner.clear(key)
+    
+    def stats(self) -> dict:
+        """Return tracked keys and local/shared hit counters."""
+        with self._lock:
+            return {
+                "keys": len(self._windows),
+                "local_hits": self.local_hits,
+                "local_rejects": self.local_rejects,
+                "syncs": self.syncs,
+            }
+    
+    def _window(self, key: str, expiry: int) -> _Window:
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now >= window.expires_at:
+            if len(self._windows) >= self.MAX_LOCAL_KEYS:
+                for stale in [k for k, w in self._windows.items() if now >= w.expires_at]:
+                    del self._windows[stale]
+            window = _Window(now + expiry)
+            self._windows[key] = window
+        return window
+    
+    @staticmethod
+    def _limit_from_key(key: str) -> Optional[int]:
+        parts = key.rsplit("/", 3)
+        if len(parts) != 4:
+            return None
+        try:
+            return int(parts[1])
+        except ValueError:
+            return None
+
+
+def _storage_options() -> dict:
+    if not settings.RATE_LIMIT_STORAGE_URI.startswith(BATCHED_PREFIX):
+        return {}
+    return {"local_share": settings.RATE_LIMIT_LOCAL_SHARE}
+
+
+# One limiter for the app and every router, so all limits share a storage
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    storage_options=_storage_options()
+)
+
+
+def rate_limit_stats() -> dict:
+    """Local counters of the batched storage (empty for other storages)."""
+    storage = limiter._storage
+    return storage.stats() if isinstance(storage, BatchedStorage) else {}
@@ -1,14 +1,20 @@
 import base64
-import os
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from app.core.config import settings
 
+# cryptography is imported when the first cipher is built
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet, MultiFernet
 
-def _get_fernet() -> Fernet:
-    """Get Fernet cipher using the encryption key from settings."""
-    key = settings.ENCRYPTION_KEY.encode()
+
+@lru_cache(maxsize=16)
+def _derive_fernet(key: str) -> "Fernet":
+    """Derive a Fernet cipher from a raw key (cached per key)."""
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    
     # Derive a proper 32-byte key using PBKDF2
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
@@ -16,10 +22,23 @@ def _get_fernet() -> Fernet:
         salt=b"meets_scheduler_salt",  # Fixed salt for deterministic encryption
         iterations=100000,
     )
-    derived_key = base64.urlsafe_b64encode(kdf.derive(key))
+    derived_key = base64.urlsafe_b64encode(kdf.derive(key.encode()))
     return Fernet(derived_key)
 
 
+@lru_cache(maxsize=4)
+def _build_multi_fernet(keys: tuple) -> "MultiFernet":
+    """Build a MultiFernet that encrypts with the first key and decrypts with any."""
+    from cryptography.fernet import MultiFernet
+    return MultiFernet([_derive_fernet(key) for key in keys])
+
+
+def _get_fernet() -> "MultiFernet":
+    """Get the cipher for the current encryption key plus any previous keys."""
+    keys = (settings.ENCRYPTION_KEY, *settings.ENCRYPTION_PREVIOUS_KEYS)
+    return _build_multi_fernet(keys)
+
+
 def encrypt_token(token: str) -> str:
     """Encrypt a token for secure storage."""
     if not token:
@@ -36,3 +55,23 @@ def decrypt_token(encrypted_token: str) -> str:
     fernet = _get_fernet()
     decrypted = fernet.decrypt(encrypted_token.encode())
     return decrypted.decode()
+
+
+def needs_rotation(encrypted_token: str) -> bool:
+    """Whether a stored token was encrypted with one of the previous keys."""
+    if not encrypted_token:
+        return False
+    from cryptography.fernet import InvalidToken
+    try:
+        _derive_fernet(settings.ENCRYPTION_KEY).decrypt(encrypted_token.encode())
+        return False
+    except InvalidToken:
+        return True
+
+
+def rotate_token(encrypted_token: str) -> str:
+    """Re-encrypt a stored token under the current encryption key."""
+    if not encrypted_token:
+        return ""
+    fernet = _get_fernet()
+    return fernet.rotate(encrypted_token.encode()).decode()
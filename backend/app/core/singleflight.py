@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """Outcome of one in-flight call, shared with the callers waiting on it."""
+    __slots__ = ("done", "result", "error")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls per key across threads.
+    
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and get the same result or exception. Nothing
+    is cached: once the call finishes, the next caller runs it again.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.errors = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the call already in flight."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+    
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for key is currently running."""
+        with self._lock:
+            return key in self._calls
+    
+    def stats(self) -> dict:
+        """Return in-flight keys and call/execution/shared counters."""
+        with self._lock:
+            return _flight_stats(self, len(self._calls))
+
+
+class AsyncSingleFlight:
+    """
+    Deduplicates concurrent coroutine calls per key on one event loop.
+    
+    The first caller for a key starts the coroutine as a task; callers
+    arriving while it runs await the same task. Each caller awaits it
+    through asyncio.shield, so a cancelled caller (e.g. a client that
+    disconnected) doesn't cancel the call for the others.
+    """
+    
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.errors = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() for key, or the call already in flight."""
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is not None:
+                self.shared += 1
+            else:
+                task = asyncio.ensure_future(fn())
+                self._tasks[key] = task
+                self.executions += 1
+                task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+    
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+            if task.cancelled() or task.exception() is not None:
+                self.errors += 1
+    
+    def stats(self) -> dict:
+        """Return in-flight keys and call/execution/shared counters."""
+        with self._lock:
+            return _flight_stats(self, len(self._tasks))
+
+
+def _flight_stats(flight, in_flight: int) -> dict:
+    return {
+        "in_flight": in_flight,
+        "calls": flight.calls,
+        "executions": flight.executions,
+        "shared": flight.shared,
+        "errors": flight.errors,
+        # Share of calls served by another caller's execution
+        "coalescing_ratio": round(flight.shared / flight.calls, 4) if flight.calls else None,
+    }
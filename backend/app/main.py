@@ -1,25 +1,62 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from contextlib import asynccontextmanager
+import asyncio
 
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import (
+    init_db, get_pool, close_pool, get_pool_stats,
+    get_async_pool, close_async_pool, get_async_pool_stats, ping_async_db
+)
+from app.core.metrics import MetricsMiddleware, render_metrics, runtime_stats
+from app.core.rate_limit import limiter, rate_limit_stats
+from app.core.cache import google_token_cache, smtp_credentials_cache, google_busy_cache
+from app.services.google_calendar import GoogleCalendarService
+from app.services.outbox_worker import outbox_worker
+from app.services.async_smtp import async_smtp
+from app.services.email_templates import compile_templates
+from app.services.free_slot_store import free_slot_refresher
+from app.services.token_refresher import google_token_refresher
 from app.api import auth, booking, smtp
 
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
+async def _preload_google_client():
+    try:
+        await asyncio.to_thread(GoogleCalendarService.get_calendar_service)
+    except Exception as e:
+        print(f"Google client preload failed: {str(e)}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Open the connection pools and initialize database on startup."""
+    get_pool()
+    await get_async_pool()
     init_db()
+    # Load the Google client and Calendar discovery document once per worker,
+    # off the startup path so the worker accepts traffic immediately
+    google_preload = None
+    if settings.GOOGLE_CLIENT_PRELOAD:
+        google_preload = asyncio.create_task(_preload_google_client())
+    compile_templates()
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    if settings.FREE_SLOT_STORE_ENABLED:
+        free_slot_refresher.start()
+    if settings.GOOGLE_TOKEN_REFRESHER_ENABLED:
+        google_token_refresher.start()
     yield
+    if google_preload is not None:
+        await google_preload
+    await google_token_refresher.stop()
+    await free_slot_refresher.stop()
+    await outbox_worker.stop()
+    await async_smtp.close_all()
+    await close_async_pool()
+    close_pool()
 
 
 app = FastAPI(
@@ -43,6 +80,22 @@ app.add_middleware(
 )
 
 
+# Request latency per route template
+app.add_middleware(MetricsMiddleware)
+
+# Pool, cache and session occupancy, read when /metrics is scraped
+runtime_stats.register("db_pool", get_pool_stats)
+runtime_stats.register("db_async_pool", get_async_pool_stats)
+runtime_stats.register("cache_google_tokens", google_token_cache.stats)
+runtime_stats.register("cache_smtp_credentials", smtp_credentials_cache.stats)
+runtime_stats.register("cache_google_busy", google_busy_cache.stats)
+runtime_stats.register("async_smtp_sessions", async_smtp.stats)
+runtime_stats.register("rate_limit", rate_limit_stats)
+runtime_stats.register("google_token_refresher", google_token_refresher.stats)
+runtime_stats.register("google_token_refresh_flights", GoogleCalendarService.token_refresh_stats)
+runtime_stats.register("availability_flights", booking.availability_flights.stats)
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(booking.router)
@@ -57,9 +110,39 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check."""
-    return {
-        "status": "healthy",
-        "database": "connected",
+    """Detailed health check. Returns 503 if the database doesn't answer."""
+    try:
+        db_latency_ms = round(await ping_async_db() * 1000, 2)
+        database = "connected"
+    except Exception as e:
+        print(f"Health check database ping failed: {str(e)}")
+        db_latency_ms = None
+        database = "unavailable"
+    
+    body = {
+        "status": "healthy" if database == "connected" else "degraded",
+        "database": database,
+        "database_latency_ms": db_latency_ms,
+        "pool": get_pool_stats(),
+        "async_pool": get_async_pool_stats(),
+        "caches": {
+            "google_tokens": google_token_cache.stats(),
+            "smtp_credentials": smtp_credentials_cache.stats(),
+            "google_busy": google_busy_cache.stats(),
+        },
+        "async_smtp_sessions": async_smtp.stats(),
+        "google_token_refresher": {
+            **google_token_refresher.stats(),
+            "single_flight": GoogleCalendarService.token_refresh_stats(),
+        },
+        "availability_flights": booking.availability_flights.stats(),
         "version": "1.0.0"
     }
+    return JSONResponse(body, status_code=200 if database == "connected" else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
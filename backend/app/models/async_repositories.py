@@ -0,0 +1,473 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from psycopg.types.json import Jsonb
+from app.core.database import get_async_db
+from app.core.cache import google_token_cache, smtp_credentials_cache
+from app.core.metrics import timed_repository
+from app.models.repositories import (
+    BOOKING_CONTEXT_QUERY, MEETING_LIST_COLUMNS, UserRepository, google_tokens_update, split_booking_context
+)
+
+
+@timed_repository
+class AsyncUserRepository:
+    """Async twin of UserRepository for use from async route handlers."""
+    
+    @staticmethod
+    async def create_user(email: str, username: str) -> dict:
+        """Create a new user."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                INSERT INTO users (email, username)
+                VALUES (%s, %s)
+                ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+                RETURNING id, email, username, google_access_token IS NOT NULL as has_google
+                """,
+                (email, username)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            return dict(result)
+    
+    @staticmethod
+    async def get_user_by_id(user_id: int) -> Optional[dict]:
+        """Get user by ID."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                "SELECT * FROM users WHERE id = %s",
+                (user_id,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+    
+    @staticmethod
+    async def get_user_by_username(username: str) -> Optional[dict]:
+        """Get user by username."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                "SELECT * FROM users WHERE username = %s",
+                (username,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+    
+    @staticmethod
+    async def get_user_by_email(email: str) -> Optional[dict]:
+        """Get user by email."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                "SELECT * FROM users WHERE email = %s",
+                (email,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+    
+    @staticmethod
+    async def update_google_tokens(
+        user_id: int,
+        access_token: str,
+        refresh_token: str,
+        token_expiry: datetime
+    ) -> bool:
+        """Update user's Google OAuth tokens (encrypted)."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(*google_tokens_update(user_id, access_token, refresh_token, token_expiry))
+            await cursor.close()
+            updated = cursor.rowcount > 0
+        
+        google_token_cache.invalidate(user_id)
+        return updated
+    
+    @staticmethod
+    async def get_decrypted_tokens(user_id: int) -> Optional[dict]:
+        """Get user's decrypted Google tokens (decryption cached per change_version)."""
+        epoch = google_token_cache.epoch()
+        user = await AsyncUserRepository.get_user_by_id(user_id)
+        return UserRepository.decrypt_user_tokens(user, epoch)
+    
+    @staticmethod
+    async def get_booking_context(user_id: int) -> Optional[dict]:
+        """Get a host and their active SMTP account in one query."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(BOOKING_CONTEXT_QUERY, (user_id,))
+            result = await cursor.fetchone()
+            await cursor.close()
+            return split_booking_context(result)
+
+
+@timed_repository
+class AsyncMeetingRepository:
+    """Async twin of MeetingRepository."""
+    
+    @staticmethod
+    async def check_slot_available(conn, host_id: int, start_ts: datetime, end_ts: datetime) -> bool:
+        """
+        Check if a time slot is free of overlapping meetings.
+        
+        A fast pre-check through the GiST exclusion index; the meetings_no_overlap
+        constraint is what actually rejects a concurrent overlapping insert.
+        """
+        cursor = conn.cursor()
+        await cursor.execute(
+            """
+            SELECT 1 FROM meetings
+            WHERE host_id = %s
+            AND tsrange(start_ts, end_ts) && tsrange(%s, %s)
+            LIMIT 1
+            """,
+            (host_id, start_ts, end_ts)
+        )
+        result = await cursor.fetchone()
+        await cursor.close()
+        return result is None
+    
+    @staticmethod
+    async def create_meeting(
+        conn,
+        host_id: int,
+        customer_email: str,
+        customer_name: str,
+        title: str,
+        start_ts: datetime,
+        end_ts: datetime,
+        meet_link: str,
+        google_event_id: str
+    ) -> dict:
+        """Create a new meeting record."""
+        cursor = conn.cursor()
+        await cursor.execute(
+            """
+            INSERT INTO meetings (host_id, customer_email, customer_name, title, start_ts, end_ts, meet_link, google_event_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING *
+            """,
+            (host_id, customer_email, customer_name, title, start_ts, end_ts, meet_link, google_event_id)
+        )
+        result = await cursor.fetchone()
+        await cursor.close()
+        return dict(result)
+    
+    @staticmethod
+    async def get_meetings_for_host(
+        host_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None
+    ) -> list:
+        """
+        Get meetings for a host within a date range, ordered by (start_ts, id).
+        
+        `after` is the (start_ts, id) of the last meeting already seen; with
+        `limit` this gives keyset pagination over idx_meetings_host_start_id.
+        """
+        query, params = AsyncMeetingRepository._meeting_list_query(host_id, start_date, end_date, after, limit)
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(query, params)
+            results = await cursor.fetchall()
+            await cursor.close()
+            return [dict(r) for r in results]
+    
+    @staticmethod
+    async def stream_meetings_for_host(
+        host_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 200
+    ) -> AsyncIterator[dict]:
+        """
+        Yield the same rows as get_meetings_for_host from a server-side cursor,
+        fetching `batch_size` rows at a time. Holds one pooled connection
+        until the iteration finishes or is closed.
+        """
+        query, params = AsyncMeetingRepository._meeting_list_query(host_id, start_date, end_date, after, limit)
+        async with get_async_db() as conn:
+            async with conn.cursor(name="meeting_stream") as cursor:
+                cursor.itersize = batch_size
+                await cursor.execute(query, params)
+                async for row in cursor:
+                    yield row
+    
+    @staticmethod
+    def _meeting_list_query(host_id, start_date, end_date, after, limit) -> tuple:
+        query = f"""
+            SELECT {MEETING_LIST_COLUMNS} FROM meetings
+            WHERE host_id = %s AND start_ts >= %s AND end_ts <= %s
+        """
+        params = [host_id, start_date, end_date]
+        if after is not None:
+            query += " AND (start_ts, id) > (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY start_ts, id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+    
+    @staticmethod
+    async def get_busy_ranges_for_host(host_id: int, start_date: datetime, end_date: datetime) -> list:
+        """
+        Get (start_ts, end_ts) of every meeting overlapping a date range.
+        Uses the same GiST index as the overlap constraint.
+        """
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                SELECT start_ts, end_ts FROM meetings
+                WHERE host_id = %s
+                AND tsrange(start_ts, end_ts) && tsrange(%s, %s)
+                """,
+                (host_id, start_date, end_date)
+            )
+            results = await cursor.fetchall()
+            await cursor.close()
+            return [dict(r) for r in results]
+    
+    @staticmethod
+    async def get_meeting_by_id(meeting_id: int) -> Optional[dict]:
+        """Get a meeting by ID."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                "SELECT * FROM meetings WHERE id = %s",
+                (meeting_id,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+
+
+@timed_repository
+class AsyncSMTPAccountRepository:
+    """Async twin of SMTPAccountRepository."""
+    
+    @staticmethod
+    async def create_smtp_account(
+        user_id: int,
+        smtp_host: str,
+        smtp_port: int,
+        smtp_user: str,
+        encrypted_password: str,
+        is_active: bool = False
+    ) -> dict:
+        """Create a new SMTP account for a user."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                INSERT INTO smtp_accounts (user_id, smtp_host, smtp_port, smtp_user, smtp_password, is_active)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id, user_id, smtp_host, smtp_port, smtp_user, is_active, created_at
+                """,
+                (user_id, smtp_host, smtp_port, smtp_user, encrypted_password, is_active)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return dict(result)
+    
+    @staticmethod
+    async def get_smtp_accounts_for_user(user_id: int) -> list:
+        """Get all SMTP accounts for a user (without passwords)."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                SELECT id, user_id, smtp_host, smtp_port, smtp_user, is_active, created_at
+                FROM smtp_accounts
+                WHERE user_id = %s
+                ORDER BY created_at DESC
+                """,
+                (user_id,)
+            )
+            results = await cursor.fetchall()
+            await cursor.close()
+            return [dict(r) for r in results]
+    
+    @staticmethod
+    async def get_active_smtp_for_user(user_id: int) -> Optional[dict]:
+        """Get the active SMTP account for a user (with encrypted password and the user's change_version)."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                SELECT s.id, s.user_id, s.smtp_host, s.smtp_port, s.smtp_user, s.smtp_password,
+                       s.is_active, s.created_at, u.change_version
+                FROM smtp_accounts s
+                JOIN users u ON u.id = s.user_id
+                WHERE s.user_id = %s AND s.is_active = true
+                """,
+                (user_id,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+    
+    @staticmethod
+    async def get_smtp_account_by_id(smtp_id: int, user_id: int) -> Optional[dict]:
+        """Get SMTP account by ID (ensuring it belongs to the user)."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                SELECT id, user_id, smtp_host, smtp_port, smtp_user, is_active, created_at
+                FROM smtp_accounts
+                WHERE id = %s AND user_id = %s
+                """,
+                (smtp_id, user_id)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            if result:
+                return dict(result)
+            return None
+    
+    @staticmethod
+    async def set_smtp_active(smtp_id: int, user_id: int) -> bool:
+        """Set an SMTP account as active (trigger handles deactivating others)."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                UPDATE smtp_accounts
+                SET is_active = true
+                WHERE id = %s AND user_id = %s
+                """,
+                (smtp_id, user_id)
+            )
+            affected = cursor.rowcount
+            await cursor.close()
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return affected > 0
+    
+    @staticmethod
+    async def delete_smtp_account(smtp_id: int, user_id: int) -> bool:
+        """Delete an SMTP account."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                DELETE FROM smtp_accounts
+                WHERE id = %s AND user_id = %s
+                """,
+                (smtp_id, user_id)
+            )
+            affected = cursor.rowcount
+            await cursor.close()
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return affected > 0
+
+
+@timed_repository
+class AsyncEmailOutboxRepository:
+    """Repository for the transactional email outbox."""
+    
+    @staticmethod
+    async def enqueue(conn, user_id: int, meeting_id: Optional[int], kind: str, payload: dict) -> dict:
+        """Queue an email in the caller's transaction."""
+        cursor = conn.cursor()
+        await cursor.execute(
+            """
+            INSERT INTO email_outbox (user_id, meeting_id, kind, payload, next_attempt_at)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING id, user_id, meeting_id, kind, status
+            """,
+            (user_id, meeting_id, kind, Jsonb(payload), datetime.utcnow())
+        )
+        result = await cursor.fetchone()
+        await cursor.close()
+        return dict(result)
+    
+    @staticmethod
+    async def claim_due(limit: int, lease_until: datetime) -> list:
+        """
+        Claim up to `limit` due messages.
+        
+        Claimed rows get attempts incremented and next_attempt_at pushed to
+        lease_until, so a crashed worker's messages become due again once
+        the lease expires. SKIP LOCKED lets several workers drain in parallel.
+        """
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                UPDATE email_outbox
+                SET attempts = attempts + 1,
+                    next_attempt_at = %s
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= %s
+                    ORDER BY next_attempt_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+                """,
+                (lease_until, datetime.utcnow(), limit)
+            )
+            results = await cursor.fetchall()
+            await cursor.close()
+            return [dict(r) for r in results]
+    
+    @staticmethod
+    async def mark_sent(message_id: int) -> bool:
+        """Mark a message as delivered."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = %s, last_error = NULL
+                WHERE id = %s
+                """,
+                (datetime.utcnow(), message_id)
+            )
+            affected = cursor.rowcount
+            await cursor.close()
+            return affected > 0
+    
+    @staticmethod
+    async def mark_failed(message_id: int, error: str, retry_at: Optional[datetime]) -> bool:
+        """Record a failed attempt; retry_at=None moves the message to the dead letters."""
+        async with get_async_db() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                """
+                UPDATE email_outbox
+                SET status = CASE WHEN %s::timestamp IS NULL THEN 'dead' ELSE 'pending' END,
+                    next_attempt_at = COALESCE(%s::timestamp, next_attempt_at),
+                    last_error = %s
+                WHERE id = %s
+                """,
+                (retry_at, retry_at, error, message_id)
+            )
+            affected = cursor.rowcount
+            await cursor.close()
+            return affected > 0
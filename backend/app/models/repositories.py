@@ -1,9 +1,82 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Callable, Optional
 from app.core.database import get_db
 from app.core.security import encrypt_token, decrypt_token
+from app.core.cache import google_token_cache, smtp_credentials_cache
+from app.core.metrics import timed_repository
 
 
+# Columns served by the meeting list endpoint
+MEETING_LIST_COLUMNS = "id, title, customer_name, customer_email, start_ts, end_ts, meet_link"
+
+# Host row plus the active SMTP account, for the booking flow
+BOOKING_CONTEXT_QUERY = """
+    SELECT u.*,
+           s.id AS smtp_id, s.smtp_host, s.smtp_port, s.smtp_user, s.smtp_password
+    FROM users u
+    LEFT JOIN smtp_accounts s ON s.user_id = u.id AND s.is_active = true
+    WHERE u.id = %s
+    LIMIT 1
+"""
+
+_SMTP_CONTEXT_COLUMNS = ('smtp_id', 'smtp_host', 'smtp_port', 'smtp_user', 'smtp_password')
+
+
+def split_booking_context(row: Optional[dict]) -> Optional[dict]:
+    """Split a BOOKING_CONTEXT_QUERY row into host and SMTP account dicts."""
+    if not row:
+        return None
+    host = {k: v for k, v in row.items() if k not in _SMTP_CONTEXT_COLUMNS}
+    smtp_account = None
+    if row['smtp_id'] is not None:
+        smtp_account = {
+            'id': row['smtp_id'],
+            'user_id': host['id'],
+            'smtp_host': row['smtp_host'],
+            'smtp_port': row['smtp_port'],
+            'smtp_user': row['smtp_user'],
+            'smtp_password': row['smtp_password'],
+            'is_active': True,
+        }
+    return {'host': host, 'smtp_account': smtp_account}
+
+
+def google_tokens_update(
+    user_id: int,
+    access_token: str,
+    refresh_token: Optional[str],
+    token_expiry: Optional[datetime],
+    expected_access_token: Optional[str] = None
+) -> tuple:
+    """
+    Build the UPDATE storing a user's Google tokens (encrypted) and bumping
+    their change_version. A None refresh_token keeps the stored one; with
+    expected_access_token the row is only updated if its encrypted access
+    token still matches. Returns (query, params).
+    """
+    query = """
+        UPDATE users
+        SET google_access_token = %s,
+            google_refresh_token = COALESCE(%s, google_refresh_token),
+            token_expiry = %s,
+            updated_at = CURRENT_TIMESTAMP,
+            change_version = change_version + 1,
+            changed_at = now() AT TIME ZONE 'utc'
+        WHERE id = %s
+    """
+    params = [
+        encrypt_token(access_token),
+        encrypt_token(refresh_token) if refresh_token else None,
+        token_expiry,
+        user_id,
+    ]
+    if expected_access_token is not None:
+        query += "    AND google_access_token = %s\n"
+        params.append(expected_access_token)
+    return query, params
+
+
+@timed_repository
 class UserRepository:
     @staticmethod
     def create_user(email: str, username: str) -> dict:
@@ -76,56 +149,158 @@ class UserRepository:
         token_expiry: datetime
     ) -> bool:
         """Update user's Google OAuth tokens (encrypted)."""
-        encrypted_access = encrypt_token(access_token)
-        encrypted_refresh = encrypt_token(refresh_token) if refresh_token else None
+        with get_db() as conn:
+            cursor = conn.cursor()
+            updated = UserRepository._write_google_tokens(
+                cursor, user_id, access_token, refresh_token, token_expiry
+            )
+            cursor.close()
+        
+        google_token_cache.invalidate(user_id)
+        return updated
+    
+    @staticmethod
+    def refresh_google_tokens(user_id: int, refresh: Callable[[dict], Optional[dict]]) -> Optional[dict]:
+        """
+        Read a user's tokens and pass them to refresh, which returns new
+        tokens or None to keep the current ones. No connection is held
+        while refresh runs; the new tokens are then stored only if the
+        access token is still the one that was read. If another worker
+        stored a refresh first, its tokens are re-read and returned.
+        """
+        user = UserRepository.get_user_by_id(user_id)
+        tokens = UserRepository.decrypt_user_tokens(user)
+        refreshed = refresh(dict(tokens)) if tokens else None
+        if refreshed is None:
+            return tokens
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            stored = UserRepository._write_google_tokens(
+                cursor,
+                user_id,
+                refreshed['access_token'],
+                refreshed.get('refresh_token'),
+                refreshed.get('token_expiry'),
+                expected_access_token=user['google_access_token']
+            )
+            cursor.close()
         
+        google_token_cache.invalidate(user_id)
+        if not stored:
+            return UserRepository.get_decrypted_tokens(user_id)
+        return dict(refreshed)
+    
+    @staticmethod
+    def _write_google_tokens(
+        cursor,
+        user_id: int,
+        access_token: str,
+        refresh_token: Optional[str],
+        token_expiry: datetime,
+        expected_access_token: Optional[str] = None
+    ) -> bool:
+        """Store Google tokens on the cursor's connection; True if the row was updated."""
+        cursor.execute(*google_tokens_update(
+            user_id, access_token, refresh_token, token_expiry, expected_access_token
+        ))
+        return cursor.rowcount > 0
+    
+    @staticmethod
+    def get_decrypted_tokens(user_id: int) -> Optional[dict]:
+        """Get user's decrypted Google tokens (decryption cached per change_version)."""
+        epoch = google_token_cache.epoch()
+        user = UserRepository.get_user_by_id(user_id)
+        return UserRepository.decrypt_user_tokens(user, epoch)
+    
+    @staticmethod
+    def get_google_connected_user_ids() -> list:
+        """IDs of users with a connected Google Calendar."""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM users WHERE google_access_token IS NOT NULL ORDER BY id"
+            )
+            results = cursor.fetchall()
+            cursor.close()
+            return [r['id'] for r in results]
+    
+    @staticmethod
+    def get_user_ids_with_tokens_expiring(before: datetime) -> list:
+        """IDs of users whose refreshable Google access token expires before `before`."""
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                UPDATE users 
-                SET google_access_token = %s,
-                    google_refresh_token = COALESCE(%s, google_refresh_token),
-                    token_expiry = %s,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s
+                SELECT id FROM users
+                WHERE google_refresh_token IS NOT NULL
+                AND token_expiry < %s
+                ORDER BY token_expiry
                 """,
-                (encrypted_access, encrypted_refresh, token_expiry, user_id)
+                (before,)
             )
+            results = cursor.fetchall()
             cursor.close()
-            return cursor.rowcount > 0
+            return [r['id'] for r in results]
     
     @staticmethod
-    def get_decrypted_tokens(user_id: int) -> Optional[dict]:
-        """Get user's decrypted Google tokens."""
-        user = UserRepository.get_user_by_id(user_id)
+    def decrypt_user_tokens(user: Optional[dict], epoch: Optional[int] = None) -> Optional[dict]:
+        """
+        Decrypt the Google tokens on a users row, reusing the cached copy
+        for the row's change_version. Pass the cache epoch captured before
+        the row was read so a concurrent invalidation isn't overwritten.
+        """
         if not user or not user.get('google_access_token'):
             return None
         
-        return {
+        version = user.get('change_version')
+        cached = google_token_cache.get(user['id'], version)
+        if cached is not None:
+            return dict(cached)
+        
+        tokens = {
             'access_token': decrypt_token(user['google_access_token']),
             'refresh_token': decrypt_token(user['google_refresh_token']) if user.get('google_refresh_token') else None,
             'token_expiry': user.get('token_expiry')
         }
+        google_token_cache.set(user['id'], tokens, version, epoch)
+        return dict(tokens)
+    
+    @staticmethod
+    def get_booking_context(user_id: int) -> Optional[dict]:
+        """
+        Get a host and their active SMTP account in one query.
+        
+        Returns {'host': users row, 'smtp_account': active smtp_accounts row
+        or None}, or None if the user does not exist.
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(BOOKING_CONTEXT_QUERY, (user_id,))
+            result = cursor.fetchone()
+            cursor.close()
+            return split_booking_context(result)
 
 
+@timed_repository
 class MeetingRepository:
     @staticmethod
     def check_slot_available(conn, host_id: int, start_ts: datetime, end_ts: datetime) -> bool:
-        """Check if a time slot is available (with row lock)."""
+        """
+        Check if a time slot is free of overlapping meetings.
+        
+        A fast pre-check through the GiST exclusion index; the meetings_no_overlap
+        constraint is what actually rejects a concurrent overlapping insert.
+        """
         cursor = conn.cursor()
         cursor.execute(
             """
-            SELECT id FROM meetings 
-            WHERE host_id = %s 
-            AND (
-                (start_ts < %s AND end_ts > %s) OR
-                (start_ts < %s AND end_ts > %s) OR
-                (start_ts >= %s AND end_ts <= %s)
-            )
-            FOR UPDATE
+            SELECT 1 FROM meetings
+            WHERE host_id = %s
+            AND tsrange(start_ts, end_ts) && tsrange(%s, %s)
+            LIMIT 1
             """,
-            (host_id, end_ts, start_ts, end_ts, start_ts, start_ts, end_ts)
+            (host_id, start_ts, end_ts)
         )
         result = cursor.fetchone()
         cursor.close()
@@ -174,6 +349,26 @@ class MeetingRepository:
             cursor.close()
             return [dict(r) for r in results]
     
+    @staticmethod
+    def get_busy_ranges_for_host(host_id: int, start_date: datetime, end_date: datetime) -> list:
+        """
+        Get (start_ts, end_ts) of every meeting overlapping a date range.
+        Uses the same GiST index as the overlap constraint.
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT start_ts, end_ts FROM meetings
+                WHERE host_id = %s
+                AND tsrange(start_ts, end_ts) && tsrange(%s, %s)
+                """,
+                (host_id, start_date, end_date)
+            )
+            results = cursor.fetchall()
+            cursor.close()
+            return [dict(r) for r in results]
+    
     @staticmethod
     def get_meeting_by_id(meeting_id: int) -> Optional[dict]:
         """Get a meeting by ID."""
@@ -190,6 +385,7 @@ class MeetingRepository:
             return None
 
 
+@timed_repository
 class SMTPAccountRepository:
     """Repository for SMTP account operations."""
     
@@ -215,7 +411,9 @@ class SMTPAccountRepository:
             )
             result = cursor.fetchone()
             cursor.close()
-            return dict(result)
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return dict(result)
     
     @staticmethod
     def get_smtp_accounts_for_user(user_id: int) -> list:
@@ -288,7 +486,9 @@ class SMTPAccountRepository:
             )
             affected = cursor.rowcount
             cursor.close()
-            return affected > 0
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return affected > 0
     
     @staticmethod
     def delete_smtp_account(smtp_id: int, user_id: int) -> bool:
@@ -304,4 +504,112 @@ class SMTPAccountRepository:
             )
             affected = cursor.rowcount
             cursor.close()
-            return affected > 0
+        
+        smtp_credentials_cache.invalidate(user_id)
+        return affected > 0
+
+
+@timed_repository
+class FreeSlotRepository:
+    """Repository for the materialized per-host free-slot store."""
+    
+    @staticmethod
+    def read_fresh_slots(
+        host_id: int,
+        first_day: date,
+        last_day: date,
+        refreshed_after: datetime,
+        not_before: datetime
+    ) -> tuple:
+        """
+        Days in [first_day, last_day] materialized after refreshed_after, and
+        their stored free slots starting at or after not_before.
+        
+        One statement, so both come from the same snapshot. Returns
+        (set of fresh days, slots ordered by start).
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT d.slot_date, s.start_ts, s.end_ts
+                FROM host_slot_days d
+                LEFT JOIN host_free_slots s
+                    ON s.host_id = d.host_id
+                    AND s.slot_date = d.slot_date
+                    AND s.start_ts >= %s
+                WHERE d.host_id = %s
+                AND d.slot_date BETWEEN %s AND %s
+                AND d.refreshed_at > %s
+                ORDER BY s.start_ts
+                """,
+                (not_before, host_id, first_day, last_day, refreshed_after)
+            )
+            results = cursor.fetchall()
+            cursor.close()
+            fresh = {r['slot_date'] for r in results}
+            slots = [{'start': r['start_ts'], 'end': r['end_ts']} for r in results if r['start_ts'] is not None]
+            return fresh, slots
+    
+    @staticmethod
+    def delete_days_before(day: date) -> int:
+        """Drop materialized days (and their slots) before a date."""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM host_slot_days WHERE slot_date < %s",
+                (day,)
+            )
+            affected = cursor.rowcount
+            cursor.close()
+            return affected
+    
+    @staticmethod
+    def replace_days(host_id: int, slots_by_day: dict) -> None:
+        """
+        Replace the stored slots for the given days in one transaction.
+        
+        Runs under the same per-host advisory lock as the meetings trigger,
+        then drops any slot overlapping a meeting committed since the slots
+        were computed.
+        """
+        if not slots_by_day:
+            return
+        days = sorted(slots_by_day)
+        now = datetime.utcnow()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext('host_free_slots'), %s)",
+                (host_id,)
+            )
+            cursor.execute(
+                "DELETE FROM host_slot_days WHERE host_id = %s AND slot_date = ANY(%s)",
+                (host_id, days)
+            )
+            cursor.executemany(
+                "INSERT INTO host_slot_days (host_id, slot_date, refreshed_at) VALUES (%s, %s, %s)",
+                [(host_id, day, now) for day in days]
+            )
+            cursor.executemany(
+                """
+                INSERT INTO host_free_slots (host_id, slot_date, start_ts, end_ts)
+                VALUES (%s, %s, %s, %s)
+                """,
+                [
+                    (host_id, day, slot['start'], slot['end'])
+                    for day in days
+                    for slot in slots_by_day[day]
+                ]
+            )
+            cursor.execute(
+                """
+                DELETE FROM host_free_slots f
+                USING meetings m
+                WHERE f.host_id = %s AND m.host_id = %s
+                AND f.slot_date = ANY(%s)
+                AND tsrange(f.start_ts, f.end_ts) && tsrange(m.start_ts, m.end_ts)
+                """,
+                (host_id, host_id, days)
+            )
+            cursor.close()
@@ -61,6 +61,7 @@ class MeetingItem(BaseModel):
 
 class MeetingListResponse(BaseModel):
     meetings: list[MeetingItem]
+    next_cursor: Optional[str] = None
 
 
 class TimeSlot(BaseModel):
@@ -74,6 +75,18 @@ class AvailabilityResponse(BaseModel):
     available_slots: list[TimeSlot]
 
 
+class TeamTimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    host_ids: Optional[list[int]] = None
+
+
+class TeamAvailabilityResponse(BaseModel):
+    host_ids: list[int]
+    mode: str
+    available_slots: list[TeamTimeSlot]
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from ssl import create_default_context
+import aiosmtplib
+from app.core.config import settings
+from app.core.metrics import smtp_send
+
+
+class _HostSlot:
+    """Concurrency cap for one SMTP host and how many sends hold or await it."""
+    __slots__ = ("semaphore", "users")
+    
+    def __init__(self, max_per_host: int):
+        self.semaphore = asyncio.Semaphore(max_per_host)
+        self.users = 0
+
+
+class AsyncSMTPEngine:
+    """
+    asyncio-native SMTP delivery.
+    
+    Port 465 uses implicit SSL, every other port upgrades with STARTTLS.
+    Authenticated sessions are reused per account while idle, a per-provider
+    semaphore bounds concurrent sessions against one SMTP host, and every
+    send runs under a deadline so a slow provider cannot hold a request or
+    the outbox worker indefinitely. Host slots are dropped as soon as no
+    send uses them and idle sessions once they expire, so hosts seen once
+    (e.g. through /smtp/test) don't accumulate.
+    """
+    
+    # Deadline (seconds) for /smtp/test connection checks
+    TEST_TIMEOUT = 10
+    
+    def __init__(self, idle_timeout: float, max_per_host: int, deadline: float):
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.deadline = deadline
+        self._idle: dict = {}
+        self._host_slots: dict = {}
+        self._last_sweep = time.monotonic()
+        self.connects = 0
+        self.reuses = 0
+        self.reconnects = 0
+        self.timeouts = 0
+    
+    async def send(self, credentials, msg: EmailMessage):
+        """
+        Send a message, waiting at most `deadline` seconds for a free
+        session and the whole SMTP exchange.
+        """
+        with smtp_send("async"):
+            try:
+                await asyncio.wait_for(self._send(credentials, msg), timeout=self.deadline)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TimeoutError(f"SMTP send to {credentials.host} exceeded {self.deadline}s")
+    
+    async def test_connection(self, host: str, port: int, user: str, password: str) -> tuple[bool, str]:
+        """
+        Test SMTP connection with provided credentials.
+        Returns (success, message).
+        """
+        client = self._client(host, port, self.TEST_TIMEOUT)
+        try:
+            async with self._host_slot(host):
+                await asyncio.wait_for(self._login(client, user, password), timeout=self.TEST_TIMEOUT)
+            if port == 465:
+                return True, "SMTP connection successful (SSL)"
+            return True, "SMTP connection successful (STARTTLS)"
+        except aiosmtplib.SMTPAuthenticationError:
+            return False, "Authentication failed. Check username and password."
+        except aiosmtplib.SMTPConnectError:
+            return False, f"Could not connect to {host}:{port}"
+        except aiosmtplib.SMTPServerDisconnected:
+            return False, "Server unexpectedly disconnected"
+        except TimeoutError:
+            return False, "Connection timed out"
+        except Exception as e:
+            return False, f"Connection failed: {str(e)}"
+        finally:
+            await self._close(client)
+    
+    async def close_all(self):
+        """Close every idle session (called on shutdown)."""
+        idle = [client for sessions in self._idle.values() for client, _ in sessions]
+        self._idle.clear()
+        for client in idle:
+            await self._close(client)
+    
+    def stats(self) -> dict:
+        """Return idle session count and connect/reuse counters."""
+        return {
+            "idle": sum(len(sessions) for sessions in self._idle.values()),
+            "accounts": len(self._idle),
+            "hosts": len(self._host_slots),
+            "connects": self.connects,
+            "reuses": self.reuses,
+            "reconnects": self.reconnects,
+            "timeouts": self.timeouts,
+        }
+    
+    async def _send(self, credentials, msg: EmailMessage):
+        async with self._host_slot(credentials.host):
+            client = await self._acquire(credentials)
+            try:
+                await client.send_message(msg)
+            except aiosmtplib.SMTPServerDisconnected:
+                client.close()
+                self.reconnects += 1
+                client = await self._connect(credentials)
+                try:
+                    await client.send_message(msg)
+                except BaseException:
+                    client.close()
+                    raise
+            except BaseException:
+                # Includes cancellation by the deadline; drop the session without a QUIT round trip
+                client.close()
+                raise
+            self._release(credentials, client)
+    
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        """Hold one of the host's session slots; the entry is dropped when unused."""
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = _HostSlot(self.max_per_host)
+            self._host_slots[host] = slot
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0 and self._host_slots.get(host) is slot:
+                del self._host_slots[host]
+    
+    @staticmethod
+    def _account_key(credentials) -> tuple:
+        # Changing the password must never reuse a session opened with the old one
+        password_hash = hashlib.sha256(credentials.password.encode()).hexdigest()
+        return (credentials.host, credentials.port, credentials.user, password_hash)
+    
+    async def _acquire(self, credentials) -> aiosmtplib.SMTP:
+        """Reuse a live idle session for this account, or open a new one."""
+        self._sweep_idle()
+        key = self._account_key(credentials)
+        sessions = self._idle.get(key)
+        while sessions:
+            client, last_used = sessions.pop()
+            if not sessions:
+                del self._idle[key]
+            reused = False
+            # Close the popped session on every path that doesn't hand it out,
+            # including cancellation or an unexpected error during the NOOP
+            try:
+                if time.monotonic() - last_used <= self.idle_timeout and client.is_connected:
+                    try:
+                        response = await client.noop()
+                        reused = response.code == 250
+                    except (aiosmtplib.SMTPException, OSError):
+                        pass
+            finally:
+                if not reused:
+                    client.close()
+            if reused:
+                self.reuses += 1
+                return client
+        
+        return await self._connect(credentials)
+    
+    def _release(self, credentials, client: aiosmtplib.SMTP):
+        """Return a healthy session to the idle list."""
+        sessions = self._idle.setdefault(self._account_key(credentials), [])
+        if len(sessions) < self.max_per_host:
+            sessions.append((client, time.monotonic()))
+        else:
+            client.close()
+    
+    def _sweep_idle(self):
+        """Close expired idle sessions and drop accounts left without any, at most once per idle_timeout."""
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_timeout:
+            return
+        self._last_sweep = now
+        for key in list(self._idle):
+            sessions = self._idle[key]
+            for client, last_used in sessions:
+                if now - last_used > self.idle_timeout:
+                    client.close()
+            sessions[:] = [entry for entry in sessions if now - entry[1] <= self.idle_timeout]
+            if not sessions:
+                del self._idle[key]
+    
+    async def _connect(self, credentials) -> aiosmtplib.SMTP:
+        client = self._client(credentials.host, credentials.port, self.deadline)
+        try:
+            await self._login(client, credentials.user, credentials.password)
+        except BaseException:
+            client.close()
+            raise
+        self.connects += 1
+        return client
+    
+    @staticmethod
+    def _client(host: str, port: int, timeout: float) -> aiosmtplib.SMTP:
+        """SSL on 465, STARTTLS on 587, 25, 2525."""
+        return aiosmtplib.SMTP(
+            hostname=host,
+            port=port,
+            timeout=timeout,
+            use_tls=port == 465,
+            start_tls=port != 465,
+            tls_context=create_default_context()
+        )
+    
+    @staticmethod
+    async def _login(client: aiosmtplib.SMTP, user: str, password: str):
+        await client.connect()
+        await client.login(user, password)
+    
+    @staticmethod
+    async def _close(client: aiosmtplib.SMTP):
+        if not client.is_connected:
+            return
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+
+
+async_smtp = AsyncSMTPEngine(
+    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+    max_per_host=settings.SMTP_POOL_MAX_PER_HOST,
+    deadline=settings.SMTP_SEND_TIMEOUT
+)
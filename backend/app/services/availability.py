@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.models.repositories import MeetingRepository, UserRepository
-from app.services.google_calendar import GoogleCalendarService
+from app.services.google_calendar import CalendarUnavailableError, GoogleCalendarService
 
 
 class AvailabilityService:
@@ -40,36 +41,175 @@ class AvailabilityService:
         if not user.get('google_access_token'):
             raise ValueError("Host has not connected Google Calendar")
         
+        # Default-duration requests are a range read over the materialized store
+        if (
+            settings.FREE_SLOT_STORE_ENABLED
+            and slot_duration_minutes == AvailabilityService.DEFAULT_SLOT_DURATION
+        ):
+            from app.services.free_slot_store import FreeSlotStore
+            stored_slots = FreeSlotStore.read(host_id, start_date, end_date)
+            if stored_slots is not None:
+                return stored_slots
+        
+        busy_periods = AvailabilityService.get_busy_periods(host_id, start_date, end_date)
+        
+        return AvailabilityService.compute_free_slots(
+            busy_periods,
+            start_date,
+            end_date,
+            slot_duration_minutes
+        )
+    
+    @staticmethod
+    def get_team_available_slots(
+        host_ids: List[int],
+        start_date: datetime,
+        end_date: datetime,
+        slot_duration_minutes: int = DEFAULT_SLOT_DURATION,
+        mode: str = "collective"
+    ) -> List[dict]:
+        """
+        Calculate available slots across several hosts (bitmap engine).
+        
+        mode="collective" returns slots where every host is free;
+        mode="round_robin" returns slots where any host is free, with the
+        free host_ids listed on each slot.
+        """
+        from app.services.bitmap_availability import BitmapAvailabilityEngine
+        
+        for host_id in host_ids:
+            user = UserRepository.get_user_by_id(host_id)
+            if not user:
+                raise ValueError(f"Host {host_id} not found")
+            if not user.get('google_access_token'):
+                raise ValueError(f"Host {host_id} has not connected Google Calendar")
+        
+        # One batched freebusy round trip for every host
+        try:
+            google_busy = GoogleCalendarService.get_busy_times_for_hosts(
+                host_ids, start_date, end_date
+            )
+        except Exception as e:
+            print(f"Team freebusy lookup failed: {str(e)}")
+            google_busy = {}
+        
+        # A host without free/busy data can't be treated as free: collective
+        # slots need every host, round robin offers only the hosts we know about
+        unavailable = [host_id for host_id in host_ids if host_id not in google_busy]
+        if unavailable and (mode == "collective" or len(unavailable) == len(host_ids)):
+            raise CalendarUnavailableError(
+                f"Google Calendar free/busy unavailable for host(s) {', '.join(map(str, unavailable))}"
+            )
+        
+        busy_by_host: Dict[int, List[Tuple[datetime, datetime]]] = {}
+        for host_id in host_ids:
+            if host_id in unavailable:
+                continue
+            existing_meetings = MeetingRepository.get_busy_ranges_for_host(
+                host_id, start_date, end_date
+            )
+            busy_by_host[host_id] = AvailabilityService._combine_busy(
+                existing_meetings, google_busy.get(host_id, [])
+            )
+        
+        return BitmapAvailabilityEngine.compute_team_slots(
+            busy_by_host,
+            start_date,
+            end_date,
+            slot_duration_minutes,
+            AvailabilityService.DEFAULT_START_HOUR,
+            AvailabilityService.DEFAULT_END_HOUR,
+            mode=mode
+        )
+    
+    @staticmethod
+    def get_busy_periods(
+        host_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        use_cache: bool = True,
+        strict: bool = False
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Collect DB meetings and Google Calendar busy times for a host.
+        
+        Google errors are ignored (DB meetings only) unless strict=True.
+        
+        Returns:
+            Unsorted list of naive-UTC (start, end) tuples
+        """
         # Get existing meetings from DB
-        existing_meetings = MeetingRepository.get_meetings_for_host(
+        existing_meetings = MeetingRepository.get_busy_ranges_for_host(
             host_id, start_date, end_date
         )
         
         # Get busy times from Google Calendar
         try:
             google_busy = GoogleCalendarService.get_busy_times(
-                host_id, start_date, end_date
+                host_id, start_date, end_date, use_cache=use_cache
             )
         except Exception:
+            if strict:
+                raise
             google_busy = []
         
-        # Combine all busy periods
-        busy_periods = []
-        
-        for meeting in existing_meetings:
-            busy_periods.append({
-                'start': meeting['start_ts'],
-                'end': meeting['end_ts']
-            })
+        return AvailabilityService._combine_busy(existing_meetings, google_busy)
+    
+    @staticmethod
+    def _combine_busy(meetings: list, google_busy: list) -> List[Tuple[datetime, datetime]]:
+        """Turn DB meetings and Google busy entries into naive-UTC tuples."""
+        busy_periods = [(m['start_ts'], m['end_ts']) for m in meetings]
         
         for busy in google_busy:
-            busy_periods.append({
-                'start': datetime.fromisoformat(busy['start'].replace('Z', '+00:00')).replace(tzinfo=None),
-                'end': datetime.fromisoformat(busy['end'].replace('Z', '+00:00')).replace(tzinfo=None)
-            })
+            busy_periods.append((
+                datetime.fromisoformat(busy['start'].replace('Z', '+00:00')).replace(tzinfo=None),
+                datetime.fromisoformat(busy['end'].replace('Z', '+00:00')).replace(tzinfo=None)
+            ))
+        
+        return busy_periods
+    
+    @staticmethod
+    def merge_busy_periods(
+        busy_periods: List[Tuple[datetime, datetime]]
+    ) -> List[Tuple[datetime, datetime]]:
+        """Sort busy periods and coalesce overlapping or touching ones."""
+        merged = []
+        for start, end in sorted(busy_periods):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+    
+    @staticmethod
+    def compute_free_slots(
+        busy_periods: List[Tuple[datetime, datetime]],
+        start_date: datetime,
+        end_date: datetime,
+        slot_duration_minutes: int = DEFAULT_SLOT_DURATION,
+        now: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Emit free working-hours slots in a single sweep over merged busy periods.
+        
+        Candidate slots are generated in increasing order, so a single pointer
+        into the sorted, coalesced busy list is enough to test every slot.
+        """
+        if now is None:
+            now = datetime.utcnow()
+        
+        busy = AvailabilityService.merge_busy_periods(busy_periods)
+        slot_length = timedelta(minutes=slot_duration_minutes)
+        
+        # First slot start for days that have already begun
+        earliest_start = now.replace(second=0, microsecond=0)
+        remainder = earliest_start.minute % slot_duration_minutes
+        if remainder != 0:
+            earliest_start += timedelta(minutes=slot_duration_minutes - remainder)
         
-        # Generate available slots
         available_slots = []
+        busy_index = 0
         current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         
         while current_date < end_date:
@@ -84,27 +224,20 @@ class AvailabilityService:
             )
             
             # Skip past times
-            if day_start < datetime.utcnow():
-                day_start = datetime.utcnow().replace(second=0, microsecond=0)
-                # Round up to next slot
-                minutes = day_start.minute
-                remainder = minutes % slot_duration_minutes
-                if remainder != 0:
-                    day_start += timedelta(minutes=slot_duration_minutes - remainder)
+            if day_start < now:
+                day_start = earliest_start
             
-            # Generate slots for this day
             slot_start = day_start
-            while slot_start + timedelta(minutes=slot_duration_minutes) <= day_end:
-                slot_end = slot_start + timedelta(minutes=slot_duration_minutes)
+            while slot_start + slot_length <= day_end:
+                slot_end = slot_start + slot_length
+                
+                # Busy periods ending before this slot can't affect later slots
+                while busy_index < len(busy) and busy[busy_index][1] <= slot_start:
+                    busy_index += 1
                 
-                # Check if slot conflicts with any busy period
-                is_available = True
-                for busy in busy_periods:
-                    if (slot_start < busy['end'] and slot_end > busy['start']):
-                        is_available = False
-                        break
+                is_available = busy_index == len(busy) or busy[busy_index][0] >= slot_end
                 
-                if is_available and slot_start >= datetime.utcnow():
+                if is_available and slot_start >= now:
                     available_slots.append({
                         'start': slot_start,
                         'end': slot_end
@@ -0,0 +1,195 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+MINUTES_PER_DAY = 24 * 60
+US_PER_MINUTE = 60 * 1_000_000
+ONE_US = timedelta(microseconds=1)
+
+
+class BitmapAvailabilityEngine:
+    """
+    Minute-granularity bitmap engine for team availability.
+    
+    Single-host pages use AvailabilityService.compute_free_slots, which is
+    faster for one calendar. Each host's window is a boolean array with one entry per minute from
+    midnight of the first day. Busy intervals are painted with vectorized
+    range updates, free runs are found by run-length detection, and team
+    availability is a plain AND/OR over per-host slot vectors.
+    """
+    
+    @staticmethod
+    def compute_team_slots(
+        busy_by_host: Dict[int, List[Tuple[datetime, datetime]]],
+        start_date: datetime,
+        end_date: datetime,
+        slot_duration_minutes: int,
+        start_hour: int,
+        end_hour: int,
+        mode: str = "collective",
+        now: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Free slots across several hosts.
+        
+        mode="collective": slots where every host is free (intersection).
+        mode="round_robin": slots where at least one host is free (union);
+        each slot also lists the free host_ids.
+        """
+        if mode not in ("collective", "round_robin"):
+            raise ValueError(f"Unknown team availability mode: {mode}")
+        if now is None:
+            now = datetime.utcnow()
+        
+        host_ids = list(busy_by_host)
+        origin, total = BitmapAvailabilityEngine._window(start_date, end_date)
+        starts = BitmapAvailabilityEngine._candidate_starts(
+            origin, total, slot_duration_minutes, start_hour, end_hour, now
+        )
+        if not host_ids:
+            return []
+        
+        # hosts x candidate slots
+        matrix = np.vstack([
+            BitmapAvailabilityEngine._slot_free_vector(
+                busy_by_host[host_id], origin, total, starts, slot_duration_minutes
+            )
+            for host_id in host_ids
+        ])
+        
+        if mode == "collective":
+            free = matrix.all(axis=0)
+            return BitmapAvailabilityEngine._to_slots(origin, starts[free], slot_duration_minutes)
+        
+        free = matrix.any(axis=0)
+        slots = BitmapAvailabilityEngine._to_slots(origin, starts[free], slot_duration_minutes)
+        host_array = np.array(host_ids)
+        for slot, column in zip(slots, matrix[:, free].T):
+            slot['host_ids'] = host_array[column].tolist()
+        return slots
+    
+    @staticmethod
+    def free_runs(busy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Run-length detection: (starts, ends) of every free run in a busy mask."""
+        padded = np.concatenate(([False], ~busy, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        return edges[0::2], edges[1::2]
+    
+    @staticmethod
+    def _window(start_date: datetime, end_date: datetime) -> Tuple[datetime, int]:
+        """Bitmap origin (midnight of the first day) and length in minutes."""
+        origin = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = max(0, math.ceil((end_date - origin) / timedelta(days=1)))
+        return origin, days * MINUTES_PER_DAY
+    
+    @staticmethod
+    def _candidate_starts(
+        origin: datetime,
+        total: int,
+        slot_duration_minutes: int,
+        start_hour: int,
+        end_hour: int,
+        now: datetime
+    ) -> np.ndarray:
+        """Working-hours slot starts (minutes from origin) not in the past."""
+        now_offset = (now - origin).total_seconds() / 60
+        
+        # First slot start for days that have already begun
+        earliest = math.floor(now_offset)
+        remainder = now.minute % slot_duration_minutes
+        if remainder != 0:
+            earliest += slot_duration_minutes - remainder
+        
+        day_starts = []
+        for day_offset in range(0, total, MINUTES_PER_DAY):
+            day_start = day_offset + start_hour * 60
+            day_end = day_offset + end_hour * 60
+            if day_start < now_offset:
+                day_start = earliest
+            if day_start + slot_duration_minutes <= day_end:
+                day_starts.append(np.arange(
+                    day_start, day_end - slot_duration_minutes + 1, slot_duration_minutes
+                ))
+        
+        if not day_starts:
+            return np.empty(0, dtype=np.int64)
+        starts = np.concatenate(day_starts).astype(np.int64)
+        return starts[starts >= now_offset]
+    
+    @staticmethod
+    def _paint(
+        busy_periods: List[Tuple[datetime, datetime]],
+        origin: datetime,
+        total: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Paint busy periods onto a per-minute mask.
+        
+        Returns (busy, points): busy[m] is True when minute m overlaps a busy
+        period; points[m] counts zero-length busy periods exactly at minute m,
+        which only block slots that strictly contain them.
+        """
+        busy = np.zeros(total, dtype=bool)
+        points = np.zeros(total + 1, dtype=np.int64)
+        if not busy_periods or total == 0:
+            return busy, points
+        
+        # Offsets from origin in microseconds
+        count = len(busy_periods)
+        starts = np.fromiter(((s - origin) // ONE_US for s, _ in busy_periods), dtype=np.int64, count=count)
+        ends = np.fromiter(((e - origin) // ONE_US for _, e in busy_periods), dtype=np.int64, count=count)
+        
+        # Zero-length periods landing on a whole minute
+        is_point = (starts == ends) & (starts % US_PER_MINUTE == 0)
+        point_minutes = starts[is_point] // US_PER_MINUTE
+        point_minutes = point_minutes[(point_minutes >= 0) & (point_minutes <= total)]
+        points = np.bincount(point_minutes, minlength=total + 1)
+        
+        # Ranges: floor(start) to ceil(end), clipped to the window
+        first = np.clip(np.floor_divide(starts[~is_point], US_PER_MINUTE), 0, total)
+        last = np.clip(-np.floor_divide(-ends[~is_point], US_PER_MINUTE), 0, total)
+        keep = last > first
+        delta = (
+            np.bincount(first[keep], minlength=total + 1)
+            - np.bincount(last[keep], minlength=total + 1)
+        )
+        busy = np.cumsum(delta[:-1]) > 0
+        return busy, points
+    
+    @staticmethod
+    def _slot_free_vector(
+        busy_periods: List[Tuple[datetime, datetime]],
+        origin: datetime,
+        total: int,
+        starts: np.ndarray,
+        slot_duration_minutes: int
+    ) -> np.ndarray:
+        """Boolean vector: is each candidate slot free for this host?"""
+        if starts.size == 0:
+            return np.zeros(0, dtype=bool)
+        
+        busy, points = BitmapAvailabilityEngine._paint(busy_periods, origin, total)
+        ends = starts + slot_duration_minutes
+        
+        # Slot is free when it lies inside a single free run
+        run_starts, run_ends = BitmapAvailabilityEngine.free_runs(busy)
+        run_index = np.searchsorted(run_starts, starts, side='right') - 1
+        in_run = run_index >= 0
+        free = np.zeros(starts.size, dtype=bool)
+        free[in_run] = run_ends[run_index[in_run]] >= ends[in_run]
+        
+        # ...and strictly contains no zero-length busy period
+        point_prefix = np.concatenate(([0], np.cumsum(points)))
+        free &= (point_prefix[ends] - point_prefix[starts + 1]) == 0
+        return free
+    
+    @staticmethod
+    def _to_slots(origin: datetime, starts: np.ndarray, slot_duration_minutes: int) -> List[dict]:
+        """Convert minute offsets back to slot dicts."""
+        length = timedelta(minutes=slot_duration_minutes)
+        return [
+            {'start': start, 'end': start + length}
+            for start in (origin + timedelta(minutes=int(m)) for m in starts)
+        ]
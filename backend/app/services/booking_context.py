@@ -0,0 +1,49 @@
+from typing import Optional
+from app.core.cache import google_token_cache, smtp_credentials_cache
+from app.models.repositories import UserRepository
+from app.models.async_repositories import AsyncUserRepository
+from app.services.email_service import SMTPCredentials, smtp_credentials_from_account
+
+
+class BookingContext:
+    """Everything /book needs about a host, loaded in one round trip."""
+    def __init__(self, host: dict, tokens: Optional[dict], smtp_credentials: Optional[SMTPCredentials]):
+        self.host = host
+        self.tokens = tokens
+        self.smtp_credentials = smtp_credentials
+    
+    @property
+    def has_google(self) -> bool:
+        return self.tokens is not None
+    
+    @property
+    def has_smtp(self) -> bool:
+        return self.smtp_credentials is not None
+
+
+async def load_booking_context(host_id: int) -> Optional[BookingContext]:
+    """
+    Load the host, decrypted Google tokens and active SMTP credentials
+    with a single users/smtp_accounts join.
+    
+    Decryption is skipped when the credential caches hold values for the
+    host's current change_version, so bookings, token refreshes and SMTP
+    edits made by any worker are picked up on the next load. Returns None
+    if the host doesn't exist.
+    """
+    token_epoch = google_token_cache.epoch()
+    smtp_epoch = smtp_credentials_cache.epoch()
+    context = await AsyncUserRepository.get_booking_context(host_id)
+    if context is None:
+        return None
+    host = context['host']
+    
+    tokens = UserRepository.decrypt_user_tokens(host, token_epoch)
+    
+    smtp_credentials = None
+    if context['smtp_account']:
+        smtp_credentials = smtp_credentials_from_account(
+            host_id, context['smtp_account'], host['change_version'], smtp_epoch
+        )
+    
+    return BookingContext(host, tokens, smtp_credentials)
@@ -1,11 +1,18 @@
-import smtplib
 from email.message import EmailMessage
 from datetime import datetime
-from ssl import create_default_context
 from typing import Optional
 
 from app.models.repositories import SMTPAccountRepository
+from app.models.async_repositories import AsyncSMTPAccountRepository
 from app.core.security import decrypt_token
+from app.core.cache import smtp_credentials_cache
+from app.services.async_smtp import async_smtp
+from app.services.email_templates import (
+    HOST_NOTIFICATION,
+    MEETING_CONFIRMATION,
+    get_template,
+    meeting_context
+)
 
 
 class SMTPCredentials:
@@ -17,62 +24,107 @@ class SMTPCredentials:
         self.password = password
 
 
-def get_user_smtp_credentials(user_id: int) -> SMTPCredentials:
+async def get_user_smtp_credentials_async(user_id: int) -> SMTPCredentials:
     """
     Get the active SMTP credentials for a user.
     Raises ValueError if no active SMTP is configured.
+    Decryption is cached per user until their change_version moves.
+    """
+    epoch = smtp_credentials_cache.epoch()
+    smtp_account = await AsyncSMTPAccountRepository.get_active_smtp_for_user(user_id)
+    return smtp_credentials_from_account(
+        user_id, smtp_account, smtp_account['change_version'] if smtp_account else None, epoch
+    )
+
+
+def smtp_credentials_from_account(
+    user_id: int,
+    smtp_account: Optional[dict],
+    change_version: Optional[int] = None,
+    epoch: Optional[int] = None
+) -> SMTPCredentials:
+    """
+    Decrypt an active SMTP account row, reusing the cached credentials for
+    the user's change_version. epoch is the cache epoch captured before
+    the row was read.
     """
-    smtp_account = SMTPAccountRepository.get_active_smtp_for_user(user_id)
-    
     if not smtp_account:
         raise ValueError(
             f"No active SMTP account configured for user {user_id}. "
             "Please configure an SMTP account in Email Settings."
         )
     
+    cached = smtp_credentials_cache.get(user_id, change_version)
+    if cached is not None:
+        return cached
+    
     # Decrypt the password
     decrypted_password = decrypt_token(smtp_account['smtp_password'])
     
-    return SMTPCredentials(
+    credentials = SMTPCredentials(
         host=smtp_account['smtp_host'],
         port=smtp_account['smtp_port'],
         user=smtp_account['smtp_user'],
         password=decrypted_password
     )
+    smtp_credentials_cache.set(user_id, credentials, change_version, epoch)
+    return credentials
 
 
-def send_email_with_credentials(
+async def send_email_with_credentials_async(
     credentials: SMTPCredentials,
     msg: EmailMessage
 ) -> bool:
     """
-    Send an email using the provided SMTP credentials.
-    Handles both SSL (465) and STARTTLS (587, 25, 2525) connections.
+    Send an email on the event loop through the async SMTP engine.
+    Bounded by per-host concurrency and SMTP_SEND_TIMEOUT. SMTP errors are
+    raised, so the outbox records the actual failure.
     """
-    try:
-        if credentials.port == 465:
-            # SSL connection
-            context = create_default_context()
-            with smtplib.SMTP_SSL(credentials.host, credentials.port, timeout=30, context=context) as server:
-                server.login(credentials.user, credentials.password)
-                server.send_message(msg)
-        else:
-            # STARTTLS connection
-            with smtplib.SMTP(credentials.host, credentials.port, timeout=30) as server:
-                server.starttls()
-                server.login(credentials.user, credentials.password)
-                server.send_message(msg)
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {str(e)}")
-        return False
+    await async_smtp.send(credentials, msg)
+    return True
+
+
+def build_confirmation_message(
+    credentials: SMTPCredentials,
+    to_email: str,
+    customer_name: str,
+    host_email: str,
+    meeting_title: str,
+    start_time: datetime,
+    end_time: datetime,
+    meet_link: str,
+    template_version: Optional[int] = None
+) -> EmailMessage:
+    """Build the customer confirmation email from the compiled template."""
+    context = meeting_context(
+        customer_name, to_email, host_email, meeting_title, start_time, end_time, meet_link
+    )
+    return get_template(MEETING_CONFIRMATION, template_version).build_message(credentials.user, to_email, context)
+
+
+def build_host_notification_message(
+    credentials: SMTPCredentials,
+    host_email: str,
+    customer_name: str,
+    customer_email: str,
+    meeting_title: str,
+    start_time: datetime,
+    end_time: datetime,
+    meet_link: str,
+    template_version: Optional[int] = None
+) -> EmailMessage:
+    """Build the new-booking notification sent to the host."""
+    context = meeting_context(
+        customer_name, customer_email, host_email, meeting_title, start_time, end_time, meet_link
+    )
+    return get_template(HOST_NOTIFICATION, template_version).build_message(credentials.user, host_email, context)
 
 
 class EmailService:
     """SMTP Email service for sending meeting confirmations using user's SMTP."""
     
     @staticmethod
-    def send_confirmation_email(
+    async def send_confirmation_email_async(
         user_id: int,
         to_email: str,
         customer_name: str,
@@ -80,7 +132,8 @@ class EmailService:
         meeting_title: str,
         start_time: datetime,
         end_time: datetime,
-        meet_link: str
+        meet_link: str,
+        template_version: Optional[int] = None
     ) -> bool:
         """
         Send meeting confirmation email to the customer.
@@ -95,122 +148,25 @@ class EmailService:
             start_time: Meeting start time (UTC)
             end_time: Meeting end time (UTC)
             meet_link: Google Meet link
-            
+            template_version: Template version to render (default: latest)
+        
         Returns:
             bool: True if email sent successfully
-            
+        
         Raises:
             ValueError: If no active SMTP is configured for the user
+            Exception: The SMTP error if the send fails
         """
-        # Get user's SMTP credentials
-        credentials = get_user_smtp_credentials(user_id)
-        
-        msg = EmailMessage()
-        msg['Subject'] = f"Meeting Confirmed: {meeting_title}"
-        msg['From'] = credentials.user
-        msg['To'] = to_email
-        
-        # Format times for display
-        start_formatted = start_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
-        end_formatted = end_time.strftime("%I:%M %p UTC")
-        duration_minutes = int((end_time - start_time).total_seconds() / 60)
-        
-        # Plain text content
-        plain_content = f"""
-Hello {customer_name},
-
-Your meeting has been confirmed!
-
-Meeting Details:
-----------------
-Title: {meeting_title}
-Date & Time: {start_formatted} - {end_formatted}
-Duration: {duration_minutes} minutes
-Host: {host_email}
-
-Join Link: {meet_link}
-
-Please click the link above to join the meeting at the scheduled time.
-
-If you need to reschedule or cancel, please contact the host at {host_email}.
-
-Best regards,
-Meeting Scheduler
-        """
-        
-        # HTML content
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #4285f4; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-        .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 8px 8px; }}
-        .details {{ background-color: white; padding: 15px; border-radius: 8px; margin: 15px 0; }}
-        .details-row {{ display: flex; padding: 8px 0; border-bottom: 1px solid #eee; }}
-        .details-label {{ font-weight: bold; width: 120px; color: #666; }}
-        .join-button {{ display: inline-block; background-color: #34a853; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; margin: 15px 0; }}
-        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Meeting Confirmed ✓</h1>
-        </div>
-        <div class="content">
-            <p>Hello {customer_name},</p>
-            <p>Your meeting has been scheduled successfully!</p>
-            
-            <div class="details">
-                <div class="details-row">
-                    <span class="details-label">Title:</span>
-                    <span>{meeting_title}</span>
-                </div>
-                <div class="details-row">
-                    <span class="details-label">Date & Time:</span>
-                    <span>{start_formatted}</span>
-                </div>
-                <div class="details-row">
-                    <span class="details-label">Duration:</span>
-                    <span>{duration_minutes} minutes</span>
-                </div>
-                <div class="details-row">
-                    <span class="details-label">Host:</span>
-                    <span>{host_email}</span>
-                </div>
-            </div>
-            
-            <p style="text-align: center;">
-                <a href="{meet_link}" class="join-button">Join Meeting</a>
-            </p>
-            
-            <p style="font-size: 13px; color: #666;">
-                Or copy this link: <a href="{meet_link}">{meet_link}</a>
-            </p>
-            
-            <p style="font-size: 13px; color: #666;">
-                If you need to reschedule or cancel, please contact the host at 
-                <a href="mailto:{host_email}">{host_email}</a>.
-            </p>
-        </div>
-        <div class="footer">
-            <p>This is an automated message from Meeting Scheduler.</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
-        
-        msg.set_content(plain_content)
-        msg.add_alternative(html_content, subtype='html')
+        credentials = await get_user_smtp_credentials_async(user_id)
+        msg = build_confirmation_message(
+            credentials, to_email, customer_name, host_email,
+            meeting_title, start_time, end_time, meet_link, template_version
+        )
         
-        return send_email_with_credentials(credentials, msg)
+        return await send_email_with_credentials_async(credentials, msg)
     
     @staticmethod
-    def send_host_notification(
+    async def send_host_notification_async(
         user_id: int,
         host_email: str,
         customer_name: str,
@@ -218,46 +174,20 @@ Meeting Scheduler
         meeting_title: str,
         start_time: datetime,
         end_time: datetime,
-        meet_link: str
+        meet_link: str,
+        template_version: Optional[int] = None
     ) -> bool:
         """
         Send notification email to the host about new booking.
         Uses the host user's active SMTP account.
         """
-        # Get user's SMTP credentials
-        credentials = get_user_smtp_credentials(user_id)
-        
-        msg = EmailMessage()
-        msg['Subject'] = f"New Booking: {meeting_title} with {customer_name}"
-        msg['From'] = credentials.user
-        msg['To'] = host_email
-        
-        start_formatted = start_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
-        duration_minutes = int((end_time - start_time).total_seconds() / 60)
-        
-        plain_content = f"""
-Hello,
-
-You have a new meeting booked!
-
-Meeting Details:
-----------------
-Title: {meeting_title}
-Customer: {customer_name} ({customer_email})
-Date & Time: {start_formatted}
-Duration: {duration_minutes} minutes
-
-Join Link: {meet_link}
-
-The customer has also received a confirmation email with the meeting details.
-
-Best regards,
-Meeting Scheduler
-        """
-        
-        msg.set_content(plain_content)
+        credentials = await get_user_smtp_credentials_async(user_id)
+        msg = build_host_notification_message(
+            credentials, host_email, customer_name, customer_email,
+            meeting_title, start_time, end_time, meet_link, template_version
+        )
         
-        return send_email_with_credentials(credentials, msg)
+        return await send_email_with_credentials_async(credentials, msg)
     
     @staticmethod
     def check_smtp_configured(user_id: int) -> bool:
@@ -0,0 +1,263 @@
+import html
+import quopri
+import re
+from datetime import datetime
+from email.message import EmailMessage
+from email.policy import default as default_policy
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+# Matches {{ variable }} placeholders
+_PLACEHOLDER = re.compile(r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\}\}")
+
+# Template kinds
+MEETING_CONFIRMATION = "meeting_confirmation"
+HOST_NOTIFICATION = "host_notification"
+
+
+class CompiledTemplate:
+    """
+    A template parsed once into a str.format pattern.
+    
+    Rendering is a single C-level format call; with escape=True every
+    variable is HTML-escaped first.
+    """
+    
+    def __init__(self, source: str, escape: bool = False):
+        parts = _PLACEHOLDER.split(source)
+        literals = [part.replace("{", "{{").replace("}", "}}") for part in parts[0::2]]
+        self.fields: Tuple[str, ...] = tuple(parts[1::2])
+        self.escape = escape
+        self._pattern = literals[0] + "".join(
+            "{%d}%s" % (i, literal) for i, literal in enumerate(literals[1:])
+        )
+    
+    def render(self, context: dict) -> str:
+        values = [context[field] for field in self.fields]
+        if self.escape:
+            values = [html.escape(str(value)) for value in values]
+        return self._pattern.format(*values)
+
+
+class CompiledEmail:
+    """
+    Compiled subject/text/html templates plus a reusable MIME skeleton.
+    
+    Part headers are parsed once; each message only renders and
+    quoted-printable encodes the bodies and sets Subject/From/To.
+    """
+    
+    def __init__(self, name: str, version: int, subject: str, text: str, html_body: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.subject = CompiledTemplate(subject)
+        self.text = CompiledTemplate(text)
+        self.html = CompiledTemplate(html_body, escape=True) if html_body is not None else None
+        self._text_headers = self._skeleton_headers("text/plain; charset=\"utf-8\"")
+        self._html_headers = self._skeleton_headers("text/html; charset=\"utf-8\"")
+        self._alternative_headers = [
+            default_policy.header_store_parse("MIME-Version", "1.0"),
+            # Boundary is generated when the message is flattened
+            default_policy.header_store_parse("Content-Type", "multipart/alternative"),
+        ]
+    
+    def build_message(self, sender: str, recipient: str, context: dict) -> EmailMessage:
+        """Render the templates into a ready-to-send message."""
+        msg = EmailMessage()
+        msg['Subject'] = self.subject.render(context)
+        msg['From'] = sender
+        msg['To'] = recipient
+        
+        text_body = self._encode(self.text.render(context))
+        if self.html is None:
+            msg.set_raw("MIME-Version", "1.0")
+            self._fill(msg, self._text_headers, text_body)
+            return msg
+        
+        for name, value in self._alternative_headers:
+            msg.set_raw(name, value)
+        msg.attach(self._fill(EmailMessage(), self._text_headers, text_body))
+        msg.attach(self._fill(EmailMessage(), self._html_headers, self._encode(self.html.render(context))))
+        return msg
+    
+    @staticmethod
+    def _skeleton_headers(content_type: str) -> list:
+        return [
+            default_policy.header_store_parse("Content-Type", content_type),
+            default_policy.header_store_parse("Content-Transfer-Encoding", "quoted-printable"),
+        ]
+    
+    @staticmethod
+    def _fill(part: EmailMessage, headers: list, payload: str) -> EmailMessage:
+        for name, value in headers:
+            part.set_raw(name, value)
+        part.set_payload(payload)
+        return part
+    
+    @staticmethod
+    def _encode(body: str) -> str:
+        return quopri.encodestring(body.encode("utf-8")).decode("ascii")
+
+
+# Template sources, keyed by (name, version). Bump the version to change a
+# template and keep the previous one until no queued outbox message pins it
+# (payload 'template_version'); the worker renders the pinned version.
+TEMPLATE_SOURCES: Dict[Tuple[str, int], dict] = {
+    (MEETING_CONFIRMATION, 1): {
+        "subject": "Meeting Confirmed: {{ meeting_title }}",
+        "text": """
+Hello {{ customer_name }},
+
+Your meeting has been confirmed!
+
+Meeting Details:
+----------------
+Title: {{ meeting_title }}
+Date & Time: {{ start_formatted }} - {{ end_formatted }}
+Duration: {{ duration_minutes }} minutes
+Host: {{ host_email }}
+
+Join Link: {{ meet_link }}
+
+Please click the link above to join the meeting at the scheduled time.
+
+If you need to reschedule or cancel, please contact the host at {{ host_email }}.
+
+Best regards,
+Meeting Scheduler
+""",
+        "html": """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background-color: #4285f4; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+        .content { background-color: #f9f9f9; padding: 20px; border-radius: 0 0 8px 8px; }
+        .details { background-color: white; padding: 15px; border-radius: 8px; margin: 15px 0; }
+        .details-row { display: flex; padding: 8px 0; border-bottom: 1px solid #eee; }
+        .details-label { font-weight: bold; width: 120px; color: #666; }
+        .join-button { display: inline-block; background-color: #34a853; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; margin: 15px 0; }
+        .footer { text-align: center; color: #666; font-size: 12px; margin-top: 20px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Meeting Confirmed ✓</h1>
+        </div>
+        <div class="content">
+            <p>Hello {{ customer_name }},</p>
+            <p>Your meeting has been scheduled successfully!</p>
+            
+            <div class="details">
+                <div class="details-row">
+                    <span class="details-label">Title:</span>
+                    <span>{{ meeting_title }}</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Date & Time:</span>
+                    <span>{{ start_formatted }}</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Duration:</span>
+                    <span>{{ duration_minutes }} minutes</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Host:</span>
+                    <span>{{ host_email }}</span>
+                </div>
+            </div>
+            
+            <p style="text-align: center;">
+                <a href="{{ meet_link }}" class="join-button">Join Meeting</a>
+            </p>
+            
+            <p style="font-size: 13px; color: #666;">
+                Or copy this link: <a href="{{ meet_link }}">{{ meet_link }}</a>
+            </p>
+            
+            <p style="font-size: 13px; color: #666;">
+                If you need to reschedule or cancel, please contact the host at 
+                <a href="mailto:{{ host_email }}">{{ host_email }}</a>.
+            </p>
+        </div>
+        <div class="footer">
+            <p>This is an automated message from Meeting Scheduler.</p>
+        </div>
+    </div>
+</body>
+</html>
+""",
+    },
+    (HOST_NOTIFICATION, 1): {
+        "subject": "New Booking: {{ meeting_title }} with {{ customer_name }}",
+        "text": """
+Hello,
+
+You have a new meeting booked!
+
+Meeting Details:
+----------------
+Title: {{ meeting_title }}
+Customer: {{ customer_name }} ({{ customer_email }})
+Date & Time: {{ start_formatted }}
+Duration: {{ duration_minutes }} minutes
+
+Join Link: {{ meet_link }}
+
+The customer has also received a confirmation email with the meeting details.
+
+Best regards,
+Meeting Scheduler
+""",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, version: Optional[int] = None) -> CompiledEmail:
+    """Compiled template by name, latest version unless one is given."""
+    if version is None:
+        versions = [v for (n, v) in TEMPLATE_SOURCES if n == name]
+        if not versions:
+            raise KeyError(f"Unknown email template: {name}")
+        version = max(versions)
+    source = TEMPLATE_SOURCES[(name, version)]
+    return CompiledEmail(name, version, source["subject"], source["text"], source.get("html"))
+
+
+def compile_templates():
+    """Compile every template up front (called on startup)."""
+    for name, version in TEMPLATE_SOURCES:
+        get_template(name, version)
+        get_template(name)
+
+
+@lru_cache(maxsize=1024)
+def _format_datetime(value: datetime, fmt: str) -> str:
+    return value.strftime(fmt)
+
+
+def meeting_context(
+    customer_name: str,
+    customer_email: str,
+    host_email: str,
+    meeting_title: str,
+    start_time: datetime,
+    end_time: datetime,
+    meet_link: str
+) -> dict:
+    """Template variables shared by the booking emails."""
+    return {
+        'customer_name': customer_name,
+        'customer_email': customer_email,
+        'host_email': host_email,
+        'meeting_title': meeting_title,
+        'start_formatted': _format_datetime(start_time, "%A, %B %d, %Y at %I:%M %p UTC"),
+        'end_formatted': _format_datetime(end_time, "%I:%M %p UTC"),
+        'duration_minutes': int((end_time - start_time).total_seconds() / 60),
+        'meet_link': meet_link,
+    }
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.repositories import FreeSlotRepository, UserRepository
+from app.services.availability import AvailabilityService
+
+
+ONE_DAY = timedelta(days=1)
+
+# Session advisory lock held for a reconciliation pass, so one worker runs it at a time
+FREE_SLOT_REFRESH_LOCK_KEY = 0x6D656574_73000003
+
+
+class FreeSlotStore:
+    """
+    Materialized free slots per host and day (default slot duration).
+    
+    Each day is computed from DB meetings and Google busy data and stored
+    in host_free_slots. The sync_host_free_slots trigger removes slots as
+    meetings are booked and sends days back for recomputation when a
+    meeting is removed or moved; FreeSlotRefresher reconciles every host
+    against Google periodically. Days that are missing or older than
+    FREE_SLOT_MAX_AGE are recomputed on read.
+    """
+    
+    @staticmethod
+    def read(host_id: int, start_date: datetime, end_date: datetime) -> Optional[List[dict]]:
+        """
+        Stored free slots for the same days as AvailabilityService.compute_free_slots.
+        Freshness and slots are read in one statement, so a day is never
+        reported fresh with slots from another snapshot. Returns None if
+        missing days could not be computed (e.g. Google is unreachable), so
+        the caller can fall back to a live computation.
+        """
+        days = FreeSlotStore.days_in_window(start_date, end_date)
+        if not days:
+            return []
+        
+        refreshed_after = datetime.utcnow() - timedelta(seconds=settings.FREE_SLOT_MAX_AGE)
+        # Same cut-off as the live engine: no slot starting in the past
+        fresh, slots = FreeSlotRepository.read_fresh_slots(
+            host_id, days[0], days[-1], refreshed_after, datetime.utcnow()
+        )
+        missing = [day for day in days if day not in fresh]
+        if not missing:
+            return slots
+        
+        try:
+            FreeSlotStore.refresh_days(host_id, missing)
+        except Exception as e:
+            print(f"Free-slot refresh failed for host {host_id}: {str(e)}")
+            return None
+        
+        fresh, slots = FreeSlotRepository.read_fresh_slots(
+            host_id, days[0], days[-1], refreshed_after, datetime.utcnow()
+        )
+        if len(fresh) < len(days):
+            # A booking invalidated a day again in between; let the caller go live
+            return None
+        return slots
+    
+    @staticmethod
+    def refresh_days(host_id: int, days: List[date], use_cache: bool = True):
+        """Recompute and store the free slots of the given days for a host."""
+        first = datetime.combine(min(days), time.min)
+        last = datetime.combine(max(days), time.min) + ONE_DAY
+        busy_periods = AvailabilityService.get_busy_periods(
+            host_id, first, last, use_cache=use_cache, strict=True
+        )
+        
+        slots_by_day = {}
+        for day in days:
+            day_start = datetime.combine(day, time.min)
+            slots_by_day[day] = AvailabilityService.compute_free_slots(
+                busy_periods,
+                day_start,
+                day_start + ONE_DAY,
+                AvailabilityService.DEFAULT_SLOT_DURATION,
+                now=day_start
+            )
+        FreeSlotRepository.replace_days(host_id, slots_by_day)
+    
+    @staticmethod
+    def days_in_window(start_date: datetime, end_date: datetime) -> List[date]:
+        """Days the availability engines scan for a window."""
+        days = []
+        current = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        while current < end_date:
+            days.append(current.date())
+            current += ONE_DAY
+        return days
+
+
+class FreeSlotRefresher:
+    """
+    Background job that reconciles every Google-connected host's upcoming
+    FREE_SLOT_HORIZON_DAYS days against fresh free/busy data. Every worker
+    runs the loop, but a pass only proceeds in the worker holding the
+    advisory lock; the others skip it.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+    
+    def start(self):
+        """Start the refresh loop on the running event loop."""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the refresh loop and wait for the current pass to finish."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+    
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.refresh_all)
+            except Exception as e:
+                print(f"Free-slot refresher error: {str(e)}")
+            
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.FREE_SLOT_REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    @staticmethod
+    def refresh_all() -> int:
+        """
+        Refresh every connected host. Returns the number of hosts refreshed,
+        or 0 if another worker holds the pass lock.
+        """
+        with get_db() as conn:
+            acquired = conn.execute(
+                "SELECT pg_try_advisory_lock(%s) AS acquired", (FREE_SLOT_REFRESH_LOCK_KEY,)
+            ).fetchone()['acquired']
+            conn.commit()
+            if not acquired:
+                return 0
+            try:
+                return FreeSlotRefresher._refresh_hosts()
+            finally:
+                conn.execute("SELECT pg_advisory_unlock(%s)", (FREE_SLOT_REFRESH_LOCK_KEY,))
+    
+    @staticmethod
+    def _refresh_hosts() -> int:
+        today = datetime.utcnow().date()
+        FreeSlotRepository.delete_days_before(today)
+        days = [today + i * ONE_DAY for i in range(settings.FREE_SLOT_HORIZON_DAYS)]
+        
+        refreshed = 0
+        for host_id in UserRepository.get_google_connected_user_ids():
+            try:
+                FreeSlotStore.refresh_days(host_id, days, use_cache=False)
+                refreshed += 1
+            except Exception as e:
+                print(f"Free-slot refresh failed for host {host_id}: {str(e)}")
+        return refreshed
+
+
+free_slot_refresher = FreeSlotRefresher()
@@ -1,46 +1,171 @@
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from app.core.config import settings
+from app.core.cache import google_busy_cache
+from app.core.metrics import GOOGLE_CALL_ERRORS, google_call
+from app.core.singleflight import SingleFlight
 from app.models.repositories import UserRepository
 
+# The Google client libraries (googleapiclient, google.auth, httplib2) are
+# imported on first use so processes that never call Google don't load them
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
+
+
+class CalendarUnavailableError(RuntimeError):
+    """Free/busy data for a host could not be fetched from Google."""
+
+
+_calendar_service = None
+_calendar_service_lock = threading.Lock()
+
+# One token refresh in flight per user
+_token_refreshes = SingleFlight()
+
+# Per-host free/busy generation: bumped whenever a host's busy data is
+# invalidated or a fetch returns something different (used in ETags)
+_busy_generations: Dict[int, Tuple[int, datetime]] = {}
+_busy_fingerprints: "OrderedDict[tuple, int]" = OrderedDict()
+_busy_generation_lock = threading.Lock()
+
 
 class GoogleCalendarService:
     """Service for interacting with Google Calendar API."""
     
     CALENDAR_SCOPES = settings.GOOGLE_SCOPES
     
+    # Timeout (seconds) for each Calendar API HTTP request
+    HTTP_TIMEOUT = 30
+    
+    # Refresh access tokens this close to expiry before using them; kept
+    # above google-auth's own refresh threshold so the transport never
+    # refreshes on its own (outside the single-flight)
+    TOKEN_REFRESH_MARGIN = 300
+    
+    # API limits: calendars per freebusy query, requests per batch call
+    MAX_FREEBUSY_ITEMS = 50
+    MAX_BATCH_SIZE = 50
+    
     @staticmethod
-    def get_credentials(user_id: int) -> Optional[Credentials]:
-        """Get valid Google credentials for a user, refreshing if needed."""
-        tokens = UserRepository.get_decrypted_tokens(user_id)
+    def get_calendar_service():
+        """
+        Get the shared Calendar v3 resource, built once from the static
+        discovery document bundled with googleapiclient.
+        
+        The resource is not bound to any user; pass an authorized http from
+        _authorized_http() to execute() for each request.
+        """
+        global _calendar_service
+        if _calendar_service is None:
+            with _calendar_service_lock:
+                if _calendar_service is None:
+                    import httplib2
+                    from googleapiclient.discovery import build
+                    _calendar_service = build(
+                        'calendar',
+                        'v3',
+                        http=httplib2.Http(timeout=GoogleCalendarService.HTTP_TIMEOUT),
+                        static_discovery=True,
+                        cache_discovery=False
+                    )
+        return _calendar_service
+    
+    @staticmethod
+    def _authorized_http(creds: "Credentials") -> "AuthorizedHttp":
+        """Bind credentials to a fresh transport for a single request."""
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        return AuthorizedHttp(creds, http=httplib2.Http(timeout=GoogleCalendarService.HTTP_TIMEOUT))
+    
+    @staticmethod
+    def get_credentials(user_id: int, tokens: Optional[dict] = None) -> Optional["Credentials"]:
+        """
+        Get valid Google credentials for a user, refreshing if needed.
+        Pass already-decrypted tokens (e.g. from the booking context) to
+        skip the lookup.
+        """
+        if tokens is None:
+            tokens = UserRepository.get_decrypted_tokens(user_id)
         if not tokens or not tokens.get('access_token'):
             return None
         
-        creds = Credentials(
+        # Refresh if expired or about to; usually the background refresher got there first
+        if tokens.get('refresh_token') and GoogleCalendarService.token_expires_within(
+            tokens.get('token_expiry'), GoogleCalendarService.TOKEN_REFRESH_MARGIN
+        ):
+            tokens = GoogleCalendarService.refresh_tokens(user_id)
+            if not tokens:
+                return None
+        
+        return GoogleCalendarService._build_credentials(tokens)
+    
+    @staticmethod
+    def refresh_tokens(user_id: int, lead_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Refresh a user's access token if it expires within lead_seconds
+        (default TOKEN_REFRESH_MARGIN) and return the current tokens.
+        
+        Concurrent callers for the same user share a single refresh within
+        a process. Across workers, the tokens are re-read before refreshing,
+        so a token another worker has just refreshed is used as is, and a
+        refresh that loses the race to store its result adopts the winner's.
+        """
+        if lead_seconds is None:
+            lead_seconds = GoogleCalendarService.TOKEN_REFRESH_MARGIN
+        return _token_refreshes.do(
+            user_id, partial(GoogleCalendarService._refresh_tokens, user_id, lead_seconds)
+        )
+    
+    @staticmethod
+    def _refresh_tokens(user_id: int, lead_seconds: float) -> Optional[dict]:
+        def refresh(tokens: dict) -> Optional[dict]:
+            if not tokens.get('refresh_token'):
+                return None
+            if not GoogleCalendarService.token_expires_within(tokens.get('token_expiry'), lead_seconds):
+                return None
+            
+            from google.auth.transport.requests import Request
+            creds = GoogleCalendarService._build_credentials(tokens)
+            with google_call("token.refresh"):
+                creds.refresh(Request())
+            return {
+                'access_token': creds.token,
+                'refresh_token': creds.refresh_token or tokens['refresh_token'],
+                'token_expiry': creds.expiry
+            }
+        
+        # Refresh outside any transaction; the store is a compare-and-set on the token read
+        return UserRepository.refresh_google_tokens(user_id, refresh)
+    
+    @staticmethod
+    def token_expires_within(token_expiry: Optional[datetime], seconds: float) -> bool:
+        """Whether a (naive UTC) token expiry is less than `seconds` away; False if unknown."""
+        if token_expiry is None:
+            return False
+        return token_expiry - timedelta(seconds=seconds) <= datetime.utcnow()
+    
+    @staticmethod
+    def token_refresh_stats() -> dict:
+        """Single-flight counters of on-demand and background token refreshes."""
+        return _token_refreshes.stats()
+    
+    @staticmethod
+    def _build_credentials(tokens: dict) -> "Credentials":
+        from google.oauth2.credentials import Credentials
+        return Credentials(
             token=tokens['access_token'],
             refresh_token=tokens.get('refresh_token'),
             token_uri="https://oauth2.googleapis.com/token",
             client_id=settings.GOOGLE_CLIENT_ID,
             client_secret=settings.GOOGLE_CLIENT_SECRET,
-            scopes=GoogleCalendarService.CALENDAR_SCOPES
+            scopes=GoogleCalendarService.CALENDAR_SCOPES,
+            expiry=tokens.get('token_expiry')
         )
-        
-        # Refresh if expired
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            # Update stored tokens
-            UserRepository.update_google_tokens(
-                user_id=user_id,
-                access_token=creds.token,
-                refresh_token=creds.refresh_token,
-                token_expiry=creds.expiry
-            )
-        
-        return creds
     
     @staticmethod
     def create_calendar_event(
@@ -49,7 +174,8 @@ class GoogleCalendarService:
         start_time: datetime,
         end_time: datetime,
         attendee_email: str,
-        description: str = ""
+        description: str = "",
+        tokens: Optional[dict] = None
     ) -> dict:
         """
         Create a Google Calendar event with Google Meet link.
@@ -57,11 +183,11 @@ class GoogleCalendarService:
         Returns:
             dict with 'event_id' and 'meet_link'
         """
-        creds = GoogleCalendarService.get_credentials(user_id)
+        creds = GoogleCalendarService.get_credentials(user_id, tokens)
         if not creds:
             raise ValueError("User has no valid Google credentials")
         
-        service = build('calendar', 'v3', credentials=creds)
+        service = GoogleCalendarService.get_calendar_service()
         
         # Build event with conference data request for Google Meet
         event = {
@@ -96,12 +222,16 @@ class GoogleCalendarService:
         }
         
         # Create event with conferenceDataVersion=1 to enable Meet link generation
-        created_event = service.events().insert(
-            calendarId='primary',
-            body=event,
-            conferenceDataVersion=1,
-            sendUpdates='all'  # Send email invites to attendees
-        ).execute()
+        with google_call("events.insert"):
+            created_event = service.events().insert(
+                calendarId='primary',
+                body=event,
+                conferenceDataVersion=1,
+                sendUpdates='all'  # Send email invites to attendees
+            ).execute(http=GoogleCalendarService._authorized_http(creds))
+        
+        # The host's calendar changed; drop cached free/busy results
+        GoogleCalendarService.invalidate_busy_times(user_id)
         
         # Extract the Meet link from the created event
         meet_link = created_event.get('hangoutLink')
@@ -115,18 +245,81 @@ class GoogleCalendarService:
         }
     
     @staticmethod
-    def get_busy_times(user_id: int, start_time: datetime, end_time: datetime) -> list:
+    def get_busy_times(
+        user_id: int,
+        start_time: datetime,
+        end_time: datetime,
+        use_cache: bool = True
+    ) -> list:
         """
         Get busy time slots from Google Calendar.
         
+        Results are cached per host for a window aligned outward to
+        GOOGLE_BUSY_CACHE_WINDOW_MINUTES, so repeated page loads share one
+        freebusy call. The returned periods may extend slightly beyond the
+        requested range.
+        
         Returns:
             List of busy time periods
         """
+        if not use_cache:
+            return GoogleCalendarService._fetch_busy_times(user_id, start_time, end_time)
+        
+        window_start, window_end = GoogleCalendarService._align_window(start_time, end_time)
+        busy_times = google_busy_cache.get_or_load(
+            (user_id, window_start, window_end),
+            lambda: GoogleCalendarService._fetch_busy_times(user_id, window_start, window_end)
+        )
+        return list(busy_times)
+    
+    @staticmethod
+    def invalidate_busy_times(user_id: int):
+        """Evict cached free/busy results for a host."""
+        google_busy_cache.invalidate_where(lambda key: key[0] == user_id)
+        GoogleCalendarService._bump_busy_generation(user_id)
+    
+    @staticmethod
+    def busy_generation(user_id: int) -> Tuple[int, Optional[datetime]]:
+        """(generation, changed_at) of a host's free/busy data as seen by this process."""
+        return _busy_generations.get(user_id, (0, None))
+    
+    @staticmethod
+    def _bump_busy_generation(user_id: int):
+        with _busy_generation_lock:
+            generation, _ = _busy_generations.get(user_id, (0, None))
+            _busy_generations[user_id] = (generation + 1, datetime.utcnow())
+    
+    @staticmethod
+    def _record_busy_result(user_id: int, start_time: datetime, end_time: datetime, busy_times: list):
+        """Bump the host's generation if a window's busy data differs from its last fetch."""
+        key = (user_id, start_time, end_time)
+        fingerprint = hash(tuple((b.get('start'), b.get('end')) for b in busy_times))
+        with _busy_generation_lock:
+            previous = _busy_fingerprints.pop(key, None)
+            _busy_fingerprints[key] = fingerprint
+            while len(_busy_fingerprints) > settings.GOOGLE_BUSY_CACHE_MAX_SIZE:
+                _busy_fingerprints.popitem(last=False)
+        if previous is not None and previous != fingerprint:
+            GoogleCalendarService._bump_busy_generation(user_id)
+    
+    @staticmethod
+    def _align_window(start_time: datetime, end_time: datetime) -> tuple:
+        """Widen a window to GOOGLE_BUSY_CACHE_WINDOW_MINUTES boundaries."""
+        step = timedelta(minutes=settings.GOOGLE_BUSY_CACHE_WINDOW_MINUTES)
+        epoch = datetime(2000, 1, 1)
+        window_start = epoch + ((start_time - epoch) // step) * step
+        window_end = epoch + -((epoch - end_time) // step) * step
+        return window_start, window_end
+    
+    @staticmethod
+    def _fetch_busy_times(user_id: int, start_time: datetime, end_time: datetime) -> list:
+        """Query Google Calendar free/busy for the primary calendar."""
         creds = GoogleCalendarService.get_credentials(user_id)
         if not creds:
-            return []
+            # Raised rather than returning [] so the host is never cached as free
+            raise CalendarUnavailableError(f"User {user_id} has no valid Google credentials")
         
-        service = build('calendar', 'v3', credentials=creds)
+        service = GoogleCalendarService.get_calendar_service()
         
         # Query free/busy information
         body = {
@@ -135,26 +328,176 @@ class GoogleCalendarService:
             'items': [{'id': 'primary'}]
         }
         
-        result = service.freebusy().query(body=body).execute()
-        busy_times = result['calendars']['primary']['busy']
+        with google_call("freebusy.query"):
+            result = service.freebusy().query(body=body).execute(
+                http=GoogleCalendarService._authorized_http(creds)
+            )
+        calendar = result.get('calendars', {}).get('primary', {})
+        if calendar.get('errors') or 'busy' not in calendar:
+            raise CalendarUnavailableError(
+                f"Freebusy error for user {user_id} calendar primary: {calendar.get('errors')}"
+            )
+        busy_times = calendar['busy']
+        GoogleCalendarService._record_busy_result(user_id, start_time, end_time, busy_times)
         
         return busy_times
     
     @staticmethod
-    def delete_calendar_event(user_id: int, event_id: str) -> bool:
+    def get_busy_times_for_hosts(
+        user_ids: List[int],
+        start_time: datetime,
+        end_time: datetime
+    ) -> Dict[int, list]:
+        """
+        Primary-calendar busy times for several hosts, served from the
+        free/busy cache where fresh and fetched in one batch otherwise.
+        
+        Hosts whose free/busy could not be fetched are left out of the
+        result (and out of the cache), never reported as free.
+        """
+        window_start, window_end = GoogleCalendarService._align_window(start_time, end_time)
+        busy_by_user = {}
+        missing = []
+        for user_id in user_ids:
+            cached = google_busy_cache.peek((user_id, window_start, window_end))
+            if cached is not None:
+                busy_by_user[user_id] = list(cached)
+            else:
+                missing.append(user_id)
+        
+        if missing:
+            fetched = GoogleCalendarService.get_busy_times_batch(
+                [(user_id, 'primary') for user_id in missing],
+                window_start,
+                window_end
+            )
+            for user_id, busy_times in fetched.items():
+                busy_by_user[user_id] = busy_times
+                GoogleCalendarService._record_busy_result(user_id, window_start, window_end, busy_times)
+                google_busy_cache.put((user_id, window_start, window_end), busy_times)
+        
+        return busy_by_user
+    
+    @staticmethod
+    def get_busy_times_batch(
+        calendars: List[Tuple[int, str]],
+        start_time: datetime,
+        end_time: datetime
+    ) -> Dict[int, list]:
+        """
+        Get busy times for many (user_id, calendar_id) pairs in as few round
+        trips as possible.
+        
+        Calendars of the same user share one freebusy query (up to
+        MAX_FREEBUSY_ITEMS each). When several users are involved, their
+        queries go out together through the Calendar batch endpoint, each
+        part carrying its own user's credentials.
+        
+        Returns:
+            Dict of user_id -> busy periods across that user's calendars.
+            Users without credentials, with any failed query, or with any
+            calendar returned with errors are left out.
+        """
+        calendars_by_user: Dict[int, List[str]] = {}
+        for user_id, calendar_id in calendars:
+            calendar_ids = calendars_by_user.setdefault(user_id, [])
+            if calendar_id not in calendar_ids:
+                calendar_ids.append(calendar_id)
+        
+        busy_by_user = {user_id: [] for user_id in calendars_by_user}
+        failed = set()
+        
+        # One query per user per MAX_FREEBUSY_ITEMS calendars
+        queries = []
+        for user_id, calendar_ids in calendars_by_user.items():
+            try:
+                creds = GoogleCalendarService.get_credentials(user_id)
+            except Exception as e:
+                print(f"Freebusy credentials failed for user {user_id}: {str(e)}")
+                creds = None
+            if not creds:
+                failed.add(user_id)
+                continue
+            for i in range(0, len(calendar_ids), GoogleCalendarService.MAX_FREEBUSY_ITEMS):
+                queries.append((user_id, creds, calendar_ids[i:i + GoogleCalendarService.MAX_FREEBUSY_ITEMS]))
+        
+        if not queries:
+            return {}
+        
+        service = GoogleCalendarService.get_calendar_service()
+        
+        def build_query(calendar_ids: List[str]):
+            return service.freebusy().query(body={
+                'timeMin': start_time.isoformat() + 'Z',
+                'timeMax': end_time.isoformat() + 'Z',
+                'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+            })
+        
+        def collect(user_id: int, result: dict):
+            for calendar_id, calendar in result.get('calendars', {}).items():
+                # A calendar Google couldn't read has no usable busy list; don't report it as free
+                if calendar.get('errors') or 'busy' not in calendar:
+                    print(f"Freebusy error for user {user_id} calendar {calendar_id}: {calendar.get('errors')}")
+                    failed.add(user_id)
+                    continue
+                busy_by_user[user_id].extend(calendar['busy'])
+        
+        # A single query doesn't need the batch envelope
+        if len(queries) == 1:
+            user_id, creds, calendar_ids = queries[0]
+            try:
+                with google_call("freebusy.query"):
+                    result = build_query(calendar_ids).execute(
+                        http=GoogleCalendarService._authorized_http(creds)
+                    )
+                collect(user_id, result)
+            except Exception as e:
+                print(f"Freebusy query failed for user {user_id}: {str(e)}")
+                failed.add(user_id)
+        else:
+            def on_response(user_id: int, request_id, response, exception):
+                if exception is not None:
+                    GOOGLE_CALL_ERRORS.labels("freebusy.batch_part").inc()
+                    print(f"Freebusy batch query failed for user {user_id}: {str(exception)}")
+                    failed.add(user_id)
+                    return
+                collect(user_id, response)
+            
+            import httplib2
+            for i in range(0, len(queries), GoogleCalendarService.MAX_BATCH_SIZE):
+                chunk = queries[i:i + GoogleCalendarService.MAX_BATCH_SIZE]
+                batch = service.new_batch_http_request()
+                for user_id, creds, calendar_ids in chunk:
+                    request = build_query(calendar_ids)
+                    # Each part is authorized with its own user's credentials
+                    request.http = GoogleCalendarService._authorized_http(creds)
+                    batch.add(request, callback=partial(on_response, user_id))
+                try:
+                    with google_call("freebusy.batch"):
+                        batch.execute(http=httplib2.Http(timeout=GoogleCalendarService.HTTP_TIMEOUT))
+                except Exception as e:
+                    print(f"Freebusy batch request failed: {str(e)}")
+                    failed.update(user_id for user_id, _, _ in chunk)
+        
+        return {user_id: busy for user_id, busy in busy_by_user.items() if user_id not in failed}
+    
+    @staticmethod
+    def delete_calendar_event(user_id: int, event_id: str, tokens: Optional[dict] = None) -> bool:
         """Delete a calendar event."""
-        creds = GoogleCalendarService.get_credentials(user_id)
+        creds = GoogleCalendarService.get_credentials(user_id, tokens)
         if not creds:
             return False
         
-        service = build('calendar', 'v3', credentials=creds)
+        service = GoogleCalendarService.get_calendar_service()
         
         try:
-            service.events().delete(
-                calendarId='primary',
-                eventId=event_id,
-                sendUpdates='all'
-            ).execute()
+            with google_call("events.delete"):
+                service.events().delete(
+                    calendarId='primary',
+                    eventId=event_id,
+                    sendUpdates='all'
+                ).execute(http=GoogleCalendarService._authorized_http(creds))
+            GoogleCalendarService.invalidate_busy_times(user_id)
             return True
         except Exception:
             return False
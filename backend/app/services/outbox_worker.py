@@ -0,0 +1,158 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+from app.core.config import settings
+from app.models.async_repositories import AsyncEmailOutboxRepository
+from app.services import email_templates
+from app.services.email_service import EmailService
+
+
+# Outbox message kinds
+CUSTOMER_CONFIRMATION = "customer_confirmation"
+HOST_NOTIFICATION = "host_notification"
+
+# Email template rendered for each kind
+KIND_TEMPLATES = {
+    CUSTOMER_CONFIRMATION: email_templates.MEETING_CONFIRMATION,
+    HOST_NOTIFICATION: email_templates.HOST_NOTIFICATION,
+}
+
+
+def meeting_email_payload(meeting: dict, host_email: str, kind: str) -> dict:
+    """
+    JSON-serializable payload of a booking email. Pins the current version
+    of the kind's template, so a message queued before a template change is
+    still sent as it was rendered at booking time.
+    """
+    return {
+        'template_version': email_templates.get_template(KIND_TEMPLATES[kind]).version,
+        'host_email': host_email,
+        'customer_name': meeting['customer_name'],
+        'customer_email': meeting['customer_email'],
+        'meeting_title': meeting['title'],
+        'start_time': meeting['start_ts'].isoformat(),
+        'end_time': meeting['end_ts'].isoformat(),
+        'meet_link': meeting['meet_link'],
+    }
+
+
+class OutboxWorker:
+    """
+    Background worker that drains the email outbox.
+    
+    Messages are claimed in batches with a lease, sent concurrently through
+    the async SMTP engine (bounded per provider host), then marked sent.
+    Failures are retried with exponential backoff and moved to the dead
+    letters after OUTBOX_MAX_ATTEMPTS attempts.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+    
+    def start(self):
+        """Start the polling loop on the running event loop."""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the polling loop and wait for the current batch to finish."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+    
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                print(f"Outbox worker error: {str(e)}")
+                processed = 0
+            
+            # Keep draining while there is a backlog, otherwise wait for the next poll
+            if processed < settings.OUTBOX_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+    
+    @staticmethod
+    async def process_batch() -> int:
+        """Claim and deliver one batch of due messages. Returns the batch size."""
+        lease_until = datetime.utcnow() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        messages = await AsyncEmailOutboxRepository.claim_due(settings.OUTBOX_BATCH_SIZE, lease_until)
+        await asyncio.gather(*(OutboxWorker.process_message(message) for message in messages))
+        return len(messages)
+    
+    @staticmethod
+    async def process_message(message: dict):
+        """Deliver one claimed message and record the outcome."""
+        try:
+            sent = await OutboxWorker.deliver(message)
+            error = None if sent else "SMTP send failed"
+        except Exception as e:
+            sent = False
+            error = str(e)
+        
+        if sent:
+            await AsyncEmailOutboxRepository.mark_sent(message['id'])
+        else:
+            retry_at = OutboxWorker.next_retry_at(message['attempts'])
+            if retry_at is None:
+                print(f"Outbox message {message['id']} dead-lettered after {message['attempts']} attempts: {error}")
+            await AsyncEmailOutboxRepository.mark_failed(message['id'], error, retry_at)
+    
+    @staticmethod
+    async def deliver(message: dict) -> bool:
+        """Send a single outbox message."""
+        payload = message['payload']
+        start_time = datetime.fromisoformat(payload['start_time'])
+        end_time = datetime.fromisoformat(payload['end_time'])
+        # Messages queued before versions were recorded render with the latest template
+        template_version = payload.get('template_version')
+        
+        if message['kind'] == CUSTOMER_CONFIRMATION:
+            return await EmailService.send_confirmation_email_async(
+                user_id=message['user_id'],
+                to_email=payload['customer_email'],
+                customer_name=payload['customer_name'],
+                host_email=payload['host_email'],
+                meeting_title=payload['meeting_title'],
+                start_time=start_time,
+                end_time=end_time,
+                meet_link=payload['meet_link'],
+                template_version=template_version
+            )
+        
+        if message['kind'] == HOST_NOTIFICATION:
+            return await EmailService.send_host_notification_async(
+                user_id=message['user_id'],
+                host_email=payload['host_email'],
+                customer_name=payload['customer_name'],
+                customer_email=payload['customer_email'],
+                meeting_title=payload['meeting_title'],
+                start_time=start_time,
+                end_time=end_time,
+                meet_link=payload['meet_link'],
+                template_version=template_version
+            )
+        
+        raise ValueError(f"Unknown outbox message kind: {message['kind']}")
+    
+    @staticmethod
+    def next_retry_at(attempts: int) -> Optional[datetime]:
+        """Exponential backoff with jitter; None once attempts are exhausted."""
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            return None
+        delay = min(
+            settings.OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)),
+            settings.OUTBOX_BACKOFF_MAX
+        )
+        delay += random.uniform(0, delay * 0.1)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+
+outbox_worker = OutboxWorker()
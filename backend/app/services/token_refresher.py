@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.repositories import UserRepository
+from app.services.google_calendar import GoogleCalendarService
+
+
+# Session advisory lock held for a refresh pass, so one worker scans at a time
+TOKEN_REFRESH_LOCK_KEY = 0x6D656574_73000002
+
+# Longest wait before retrying a user whose refresh keeps failing (e.g. revoked access)
+MAX_FAILURE_BACKOFF = 3600
+
+
+class GoogleTokenRefresher:
+    """
+    Background job that renews Google access tokens expiring within
+    GOOGLE_TOKEN_REFRESH_LEAD seconds, so request handlers find a valid
+    token instead of refreshing inline.
+    
+    Refreshes go through GoogleCalendarService.refresh_tokens and share its
+    per-user single-flight with on-demand refreshes. Users whose refresh
+    fails are retried with exponential backoff.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        # user_id -> (consecutive failures, monotonic time of the next attempt)
+        self._failures: Dict[int, tuple] = {}
+        self.refreshed = 0
+        self.failed = 0
+        self.passes = 0
+    
+    def start(self):
+        """Start the refresh loop on the running event loop."""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the refresh loop and wait for the current pass to finish."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+    
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.refresh_due)
+            except Exception as e:
+                print(f"Token refresher error: {str(e)}")
+            
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.GOOGLE_TOKEN_REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    def refresh_due(self) -> int:
+        """
+        Refresh every token expiring within the lead time. Returns the
+        number refreshed, or 0 if another worker holds the pass lock.
+        """
+        with get_db() as conn:
+            acquired = conn.execute(
+                "SELECT pg_try_advisory_lock(%s) AS acquired", (TOKEN_REFRESH_LOCK_KEY,)
+            ).fetchone()['acquired']
+            conn.commit()
+            if not acquired:
+                return 0
+            try:
+                return self._refresh_expiring()
+            finally:
+                conn.execute("SELECT pg_advisory_unlock(%s)", (TOKEN_REFRESH_LOCK_KEY,))
+    
+    def _refresh_expiring(self) -> int:
+        lead = settings.GOOGLE_TOKEN_REFRESH_LEAD
+        before = datetime.utcnow() + timedelta(seconds=lead)
+        now = time.monotonic()
+        
+        refreshed = 0
+        for user_id in UserRepository.get_user_ids_with_tokens_expiring(before):
+            failures, retry_at = self._failures.get(user_id, (0, 0.0))
+            if retry_at > now:
+                continue
+            try:
+                GoogleCalendarService.refresh_tokens(user_id, lead)
+                self._failures.pop(user_id, None)
+                refreshed += 1
+            except Exception as e:
+                failures += 1
+                delay = min(settings.GOOGLE_TOKEN_REFRESH_INTERVAL * 2 ** failures, MAX_FAILURE_BACKOFF)
+                self._failures[user_id] = (failures, time.monotonic() + delay)
+                self.failed += 1
+                print(f"Token refresh failed for user {user_id} ({failures} in a row): {str(e)}")
+        
+        self.refreshed += refreshed
+        self.passes += 1
+        return refreshed
+    
+    def stats(self) -> dict:
+        """Return pass/refresh/failure counters and the number of users in backoff."""
+        return {
+            "passes": self.passes,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "backing_off": len(self._failures),
+        }
+
+
+google_token_refresher = GoogleTokenRefresher()
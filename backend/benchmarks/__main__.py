@@ -0,0 +1,120 @@
+"""
+Run every benchmark module (benchmarks/bench_*.py) and write the results
+as JSON, optionally comparing them with an earlier run.
+
+Run from the backend directory:
+    python -m benchmarks                              # all, JSON to stdout
+    python -m benchmarks availability serialization   # selected modules
+    python -m benchmarks -o bench.json --compare baseline.json --threshold 0.25
+
+Module output and the result tables go to stderr so stdout stays valid
+JSON. With --compare, the exit status is 1 if any benchmark got slower by
+more than the threshold (per-call time, relative).
+"""
+import argparse
+import importlib
+import json
+import pkgutil
+import platform
+import subprocess
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+import benchmarks
+from benchmarks.harness import print_results
+
+FORMAT_VERSION = 1
+
+
+def available_modules() -> list:
+    """Benchmark names, i.e. bench_<name>.py modules."""
+    return sorted(
+        info.name[len("bench_"):]
+        for info in pkgutil.iter_modules(benchmarks.__path__)
+        if info.name.startswith("bench_")
+    )
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_modules(names: list) -> dict:
+    """Run each module's run() and collect its results by module name."""
+    results = {}
+    for name in names:
+        print(f"== {name}", file=sys.stderr)
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        with redirect_stdout(sys.stderr):
+            results[name] = module.run()
+            print_results(results[name])
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Benchmarks present in both runs whose per-call time grew by more than
+    `threshold`. Returns (module, name, baseline_us, current_us, ratio) rows.
+    """
+    regressions = []
+    for module, results in current["results"].items():
+        previous = {r["name"]: r for r in baseline.get("results", {}).get(module, [])}
+        for result in results:
+            before = previous.get(result["name"])
+            if not before or not before["per_call_us"]:
+                continue
+            ratio = result["per_call_us"] / before["per_call_us"]
+            if ratio > 1 + threshold:
+                regressions.append((module, result["name"], before["per_call_us"], result["per_call_us"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the offline benchmark suite.")
+    parser.add_argument("modules", nargs="*", help=f"modules to run (default: all of {', '.join(available_modules())})")
+    parser.add_argument("-o", "--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (default: 0.25)")
+    args = parser.parse_args(argv)
+    
+    names = args.modules or available_modules()
+    unknown = sorted(set(names) - set(available_modules()))
+    if unknown:
+        parser.error(f"unknown benchmark module(s): {', '.join(unknown)}")
+    
+    report = {
+        "format_version": FORMAT_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": run_modules(names),
+    }
+    
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for module, name, before, after, ratio in regressions:
+            print(f"REGRESSION {module}: {name}: {before:.3f} -> {after:.3f} us/call ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Availability engines vs. the original nested-loop scan.
+
+Checks that the sweep-line engine (AvailabilityService.compute_free_slots)
+and the team bitmap engine (BitmapAvailabilityEngine, with one host) produce
+exactly the same slots as the original implementation on randomly generated
+calendars, and that the
+materialized free-slot store (whole days computed by
+FreeSlotStore.refresh_days, read back from 'now') matches the live engine.
+Then times the scan and the sweep over 30-day windows with 1k and 10k busy
+intervals, and the bitmap engine over a 30-host team intersection.
+
+Run from the backend directory:
+    python -m benchmarks.bench_availability
+"""
+import random
+from datetime import datetime, timedelta
+from app.services.availability import AvailabilityService
+from app.services.bitmap_availability import BitmapAvailabilityEngine
+from app.services.free_slot_store import FreeSlotStore
+from benchmarks.harness import measure, print_results
+
+
+def reference_slots(busy_periods, start_date, end_date, slot_duration_minutes, now):
+    """The original O(slots x busy) scan, with a fixed 'now'."""
+    busy_periods = [{'start': s, 'end': e} for s, e in busy_periods]
+    available_slots = []
+    current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    while current_date < end_date:
+        day_start = current_date.replace(hour=AvailabilityService.DEFAULT_START_HOUR, minute=0)
+        day_end = current_date.replace(hour=AvailabilityService.DEFAULT_END_HOUR, minute=0)
+        
+        if day_start < now:
+            day_start = now.replace(second=0, microsecond=0)
+            minutes = day_start.minute
+            remainder = minutes % slot_duration_minutes
+            if remainder != 0:
+                day_start += timedelta(minutes=slot_duration_minutes - remainder)
+        
+        slot_start = day_start
+        while slot_start + timedelta(minutes=slot_duration_minutes) <= day_end:
+            slot_end = slot_start + timedelta(minutes=slot_duration_minutes)
+            
+            is_available = True
+            for busy in busy_periods:
+                if (slot_start < busy['end'] and slot_end > busy['start']):
+                    is_available = False
+                    break
+            
+            if is_available and slot_start >= now:
+                available_slots.append({'start': slot_start, 'end': slot_end})
+            
+            slot_start = slot_end
+        
+        current_date += timedelta(days=1)
+    
+    return available_slots
+
+
+def random_busy_periods(rng, start_date, days, count):
+    """Random busy periods, including overlaps, touching and zero-length ones."""
+    window_minutes = days * 24 * 60
+    periods = []
+    for _ in range(count):
+        start = start_date + timedelta(minutes=rng.randrange(-120, window_minutes))
+        length = rng.choice([0, 5, 15, 30, 45, 60, 90, 240, rng.randrange(0, 600)])
+        periods.append((start, start + timedelta(minutes=length, seconds=rng.choice([0, 0, 30]))))
+    return periods
+
+
+def check_equivalence(cases: int = 500, seed: int = 1234) -> int:
+    """Compare both engines on random inputs; raises AssertionError on mismatch."""
+    rng = random.Random(seed)
+    for _ in range(cases):
+        now = datetime(2026, 3, 2, rng.randrange(0, 24), rng.randrange(0, 60), rng.randrange(0, 60))
+        start_date = now
+        days = rng.randrange(1, 15)
+        end_date = start_date + timedelta(days=days)
+        duration = rng.choice([15, 20, 30, 45, 60])
+        busy = random_busy_periods(rng, start_date.replace(hour=0, minute=0), days, rng.randrange(0, 60))
+        
+        expected = reference_slots(busy, start_date, end_date, duration, now)
+        actual = AvailabilityService.compute_free_slots(busy, start_date, end_date, duration, now=now)
+        assert actual == expected, ("sweep", busy, start_date, end_date, duration, now)
+        actual = _bitmap_slots(busy, start_date, end_date, duration, now)
+        assert actual == expected, ("bitmap", busy, start_date, end_date, duration, now)
+    return cases
+
+
+def check_store_equivalence(cases: int = 500, seed: int = 4321) -> int:
+    """
+    Compare stored-day slots with the live engine; raises AssertionError on
+    mismatch. Mirrors FreeSlotStore.refresh_days (each day computed whole)
+    and FreeSlotRepository.read_fresh_slots (slots starting at or after 'now').
+    """
+    rng = random.Random(seed)
+    duration = AvailabilityService.DEFAULT_SLOT_DURATION
+    for _ in range(cases):
+        now = datetime(2026, 3, 2, rng.randrange(0, 24), rng.randrange(0, 60), rng.randrange(0, 60))
+        days = rng.randrange(1, 15)
+        end_date = now + timedelta(days=days, minutes=rng.randrange(0, 24 * 60))
+        busy = random_busy_periods(rng, now.replace(hour=0, minute=0), days + 1, rng.randrange(0, 60))
+        
+        stored = []
+        for day in FreeSlotStore.days_in_window(now, end_date):
+            day_start = datetime.combine(day, datetime.min.time())
+            stored.extend(AvailabilityService.compute_free_slots(
+                busy, day_start, day_start + timedelta(days=1), duration, now=day_start
+            ))
+        stored = [slot for slot in stored if slot['start'] >= now]
+        
+        expected = AvailabilityService.compute_free_slots(busy, now, end_date, duration, now=now)
+        assert stored == expected, ("store", busy, now, end_date)
+    return cases
+
+
+def _bitmap_slots(busy, start_date, end_date, duration, now):
+    """A one-host collective team, which must match the single-host engines."""
+    return BitmapAvailabilityEngine.compute_team_slots(
+        {0: busy}, start_date, end_date, duration,
+        AvailabilityService.DEFAULT_START_HOUR, AvailabilityService.DEFAULT_END_HOUR, now=now
+    )
+
+
+def run() -> list:
+    check_equivalence()
+    check_store_equivalence()
+    
+    rng = random.Random(42)
+    now = datetime(2026, 3, 2, 8, 0)
+    end_date = now + timedelta(days=30)
+    results = []
+    for count in (1_000, 10_000):
+        busy = random_busy_periods(rng, now.replace(hour=0), 30, count)
+        results.append(measure(
+            f"scan   30d / {count} busy",
+            lambda: reference_slots(busy, now, end_date, 30, now),
+            number=1, repeat=3
+        ))
+        results.append(measure(
+            f"sweep  30d / {count} busy",
+            lambda: AvailabilityService.compute_free_slots(busy, now, end_date, 30, now=now),
+            number=10, repeat=3
+        ))
+    
+    team = {host_id: random_busy_periods(rng, now.replace(hour=0), 30, 300) for host_id in range(30)}
+    results.append(measure(
+        "bitmap team 30 hosts x 30d (collective)",
+        lambda: BitmapAvailabilityEngine.compute_team_slots(
+            team, now, end_date, 30,
+            AvailabilityService.DEFAULT_START_HOUR, AvailabilityService.DEFAULT_END_HOUR, now=now
+        ),
+        number=10, repeat=3
+    ))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"equivalence: {check_equivalence()} random cases match")
+    print(f"store equivalence: {check_store_equivalence()} random cases match")
+    print_results(run())
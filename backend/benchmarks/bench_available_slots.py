@@ -0,0 +1,44 @@
+"""
+AvailabilityService.get_available_slots end to end (host lookup, DB
+meetings, Google free/busy parsing, merge and slot generation) against
+in-process fakes, for calendars of increasing density.
+
+Run from the backend directory:
+    python -m benchmarks.bench_available_slots
+"""
+import random
+from datetime import datetime, timedelta
+from app.services.availability import AvailabilityService
+from benchmarks.fakes import FakeDatabase, FakeGoogleCalendar, fake_backends, synthetic_calendar
+from benchmarks.harness import measure, print_results
+
+HOST_ID = 1
+
+# Busy blocks per day: empty, light, typical, back-to-back
+DENSITIES = (0, 4, 12, 40)
+WINDOWS = (7, 30)
+
+
+def run() -> list:
+    rng = random.Random(42)
+    start = datetime.utcnow()
+    results = []
+    
+    for density in DENSITIES:
+        meetings, google_busy = synthetic_calendar(rng, start, max(WINDOWS) + 1, density)
+        db = FakeDatabase({HOST_ID: meetings})
+        google = FakeGoogleCalendar({HOST_ID: google_busy})
+        
+        with fake_backends(db, google):
+            for days in WINDOWS:
+                end = start + timedelta(days=days)
+                results.append(measure(
+                    f"get_available_slots {days:>2}d / {density:>2} busy/day",
+                    lambda: AvailabilityService.get_available_slots(HOST_ID, start, end),
+                    number=20 if days == 30 else 50, repeat=3
+                ))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run())
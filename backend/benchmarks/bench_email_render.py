@@ -0,0 +1,169 @@
+"""
+Booking email rendering: per-call f-string + set_content/add_alternative
+vs. the compiled templates with a reusable MIME skeleton.
+
+Reports messages rendered per second, both for building the EmailMessage
+and for building plus flattening it to wire bytes (what SMTP sends), and
+for EmailService.send_confirmation_email_async end to end against a fake SMTP.
+
+Run from the backend directory:
+    python -m benchmarks.bench_email_render
+"""
+import asyncio
+from datetime import datetime
+from email.message import EmailMessage
+from app.services.email_templates import (
+    MEETING_CONFIRMATION,
+    compile_templates,
+    get_template,
+    meeting_context
+)
+from app.services.email_service import EmailService
+from benchmarks.fakes import FakeDatabase, FakeSMTP, fake_backends
+from benchmarks.harness import measure, print_results
+
+SENDER = "host@example.com"
+RECIPIENT = "customer@example.com"
+START = datetime(2026, 3, 2, 15, 0)
+END = datetime(2026, 3, 2, 15, 30)
+MEET_LINK = "https://meet.google.com/abc-defg-hij"
+
+
+def legacy_confirmation(customer_name, host_email, meeting_title, start_time, end_time, meet_link):
+    """The original per-call construction from EmailService."""
+    msg = EmailMessage()
+    msg['Subject'] = f"Meeting Confirmed: {meeting_title}"
+    msg['From'] = SENDER
+    msg['To'] = RECIPIENT
+    
+    # Format times for display
+    start_formatted = start_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
+    end_formatted = end_time.strftime("%I:%M %p UTC")
+    duration_minutes = int((end_time - start_time).total_seconds() / 60)
+    
+    # Plain text content
+    plain_content = f"""
+Hello {customer_name},
+
+Your meeting has been confirmed!
+
+Meeting Details:
+----------------
+Title: {meeting_title}
+Date & Time: {start_formatted} - {end_formatted}
+Duration: {duration_minutes} minutes
+Host: {host_email}
+
+Join Link: {meet_link}
+
+Please click the link above to join the meeting at the scheduled time.
+
+If you need to reschedule or cancel, please contact the host at {host_email}.
+
+Best regards,
+Meeting Scheduler
+    """
+    
+    # HTML content
+    html_content = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+        .header {{ background-color: #4285f4; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
+        .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 8px 8px; }}
+        .details {{ background-color: white; padding: 15px; border-radius: 8px; margin: 15px 0; }}
+        .details-row {{ display: flex; padding: 8px 0; border-bottom: 1px solid #eee; }}
+        .details-label {{ font-weight: bold; width: 120px; color: #666; }}
+        .join-button {{ display: inline-block; background-color: #34a853; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; margin: 15px 0; }}
+        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Meeting Confirmed ✓</h1>
+        </div>
+        <div class="content">
+            <p>Hello {customer_name},</p>
+            <p>Your meeting has been scheduled successfully!</p>
+            
+            <div class="details">
+                <div class="details-row">
+                    <span class="details-label">Title:</span>
+                    <span>{meeting_title}</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Date & Time:</span>
+                    <span>{start_formatted}</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Duration:</span>
+                    <span>{duration_minutes} minutes</span>
+                </div>
+                <div class="details-row">
+                    <span class="details-label">Host:</span>
+                    <span>{host_email}</span>
+                </div>
+            </div>
+            
+            <p style="text-align: center;">
+                <a href="{meet_link}" class="join-button">Join Meeting</a>
+            </p>
+            
+            <p style="font-size: 13px; color: #666;">
+                Or copy this link: <a href="{meet_link}">{meet_link}</a>
+            </p>
+            
+            <p style="font-size: 13px; color: #666;">
+                If you need to reschedule or cancel, please contact the host at 
+                <a href="mailto:{host_email}">{host_email}</a>.
+            </p>
+        </div>
+        <div class="footer">
+            <p>This is an automated message from Meeting Scheduler.</p>
+        </div>
+    </div>
+</body>
+</html>
+    """
+    
+    msg.set_content(plain_content)
+    msg.add_alternative(html_content, subtype='html')
+    return msg
+
+
+def compiled_confirmation(customer_name, host_email, meeting_title, start_time, end_time, meet_link):
+    context = meeting_context(
+        customer_name, RECIPIENT, host_email, meeting_title, start_time, end_time, meet_link
+    )
+    return get_template(MEETING_CONFIRMATION).build_message(SENDER, RECIPIENT, context)
+
+
+def run() -> list:
+    compile_templates()
+    args = ("Ada Lovelace", SENDER, "Intro call", START, END, MEET_LINK)
+    
+    results = [
+        measure("f-string + set_content (build)", lambda: legacy_confirmation(*args), number=500),
+        measure("compiled template (build)", lambda: compiled_confirmation(*args), number=500),
+        measure("f-string + set_content (build + bytes)", lambda: legacy_confirmation(*args).as_bytes(), number=500),
+        measure("compiled template (build + bytes)", lambda: compiled_confirmation(*args).as_bytes(), number=500),
+    ]
+    loop = asyncio.new_event_loop()
+    try:
+        with fake_backends(FakeDatabase(), smtp=FakeSMTP()):
+            results.append(measure(
+                "EmailService.send_confirmation_email_async (fake SMTP)",
+                lambda: loop.run_until_complete(EmailService.send_confirmation_email_async(1, RECIPIENT, *args)),
+                number=500
+            ))
+    finally:
+        loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run())
@@ -0,0 +1,105 @@
+"""
+Cold import cost of app.main, per module, from `python -X importtime`,
+plus a check that the heavy optional libraries stay lazily imported.
+
+Each measurement is a fresh interpreter; the best of several runs is
+reported as per_call_us (cumulative microseconds, including submodules)
+so `python -m benchmarks --compare` flags import-time regressions.
+
+Run from the backend directory:
+    python -m benchmarks.bench_import_time
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from benchmarks.harness import print_results
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Loaded on first use only; importing app.main must not pull these in
+LAZY_MODULES = (
+    "googleapiclient.discovery",
+    "google_auth_oauthlib.flow",
+    "google.oauth2.id_token",
+    "google.oauth2.credentials",
+    "google_auth_httplib2",
+    "httplib2",
+    "cryptography",
+    "numpy",
+)
+
+RUNS = 5
+TOP_MODULES = 15
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+
+
+def import_times() -> dict:
+    """{module: cumulative_us} for app.main and the modules it imports directly."""
+    stderr = _python("-X", "importtime", "-c", "import app.main").stderr
+    times = {}
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # Children are listed before their parent; keep depth 1 only under app.main
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == "app.main":
+                times.update(children)
+                times["app.main"] = int(cumulative)
+            children = {}
+    return times
+
+
+def check_lazy_imports() -> list:
+    """Raise AssertionError if importing app.main loads any LAZY_MODULES."""
+    code = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    loaded = [m for m in _python("-c", code).stdout.strip().split(",") if m]
+    assert not loaded, f"Imported eagerly by app.main: {', '.join(loaded)}"
+    return loaded
+
+
+def run() -> list:
+    check_lazy_imports()
+    
+    best = {}
+    for _ in range(RUNS):
+        for module, cumulative in import_times().items():
+            best[module] = min(cumulative, best.get(module, cumulative))
+    
+    total = best.pop("app.main")
+    top = sorted(best.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]
+    return [_result("import app.main", total)] + [_result(f"  {module}", us) for module, us in top]
+
+
+def _result(name: str, us: int) -> dict:
+    return {
+        "name": name,
+        "number": 1,
+        "repeat": RUNS,
+        "per_call_us": float(us),
+        "ops_per_sec": round(1_000_000 / us, 1) if us else None,
+    }
+
+
+if __name__ == "__main__":
+    print_results(run())
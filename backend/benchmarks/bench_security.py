@@ -0,0 +1,40 @@
+"""
+Per-call cost of encrypt_token/decrypt_token with and without the cached
+Fernet key derivation.
+
+Run from the backend directory:
+    python -m benchmarks.bench_security
+"""
+from app.core.config import settings
+from app.core import security
+from benchmarks.harness import measure, print_results
+
+TOKEN = "ya29.a0AfH6SMBx-example-google-access-token-0123456789"
+
+
+def _uncached_encrypt(token: str) -> str:
+    # Previous behaviour: PBKDF2 derivation on every call
+    fernet = security._derive_fernet.__wrapped__(settings.ENCRYPTION_KEY)
+    return fernet.encrypt(token.encode()).decode()
+
+
+def _uncached_decrypt(encrypted: str) -> str:
+    fernet = security._derive_fernet.__wrapped__(settings.ENCRYPTION_KEY)
+    return fernet.decrypt(encrypted.encode()).decode()
+
+
+def run() -> list:
+    if not settings.ENCRYPTION_KEY:
+        settings.ENCRYPTION_KEY = "benchmark-encryption-key-32-chars!!"
+    encrypted = security.encrypt_token(TOKEN)
+    
+    return [
+        measure("encrypt_token (derive per call)", lambda: _uncached_encrypt(TOKEN), number=20),
+        measure("decrypt_token (derive per call)", lambda: _uncached_decrypt(encrypted), number=20),
+        measure("encrypt_token (cached key)", lambda: security.encrypt_token(TOKEN), number=5000),
+        measure("decrypt_token (cached key)", lambda: security.decrypt_token(encrypted), number=5000),
+    ]
+
+
+if __name__ == "__main__":
+    print_results(run())
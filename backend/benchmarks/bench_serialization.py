@@ -0,0 +1,56 @@
+"""
+Serializing AvailabilityResponse with thousands of TimeSlots: building the
+models the way the route does, pydantic's own JSON encoder, and FastAPI's
+response path (jsonable_encoder + json.dumps, as JSONResponse renders it).
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization
+"""
+import json
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from app.models.schemas import AvailabilityResponse, TimeSlot
+from benchmarks.harness import measure, print_results
+
+START = datetime(2026, 3, 2, 9, 0)
+
+
+def slot_dicts(count: int) -> list:
+    """Engine-shaped output: consecutive 30-minute slots."""
+    step = timedelta(minutes=30)
+    return [{'start': START + i * step, 'end': START + (i + 1) * step} for i in range(count)]
+
+
+def build_response(slots: list) -> AvailabilityResponse:
+    """Same construction as the availability route."""
+    return AvailabilityResponse(
+        host_id=1,
+        host_email="host@example.com",
+        available_slots=[TimeSlot(start=s['start'], end=s['end']) for s in slots]
+    )
+
+
+def run() -> list:
+    results = []
+    for count in (1_000, 5_000):
+        slots = slot_dicts(count)
+        response = build_response(slots)
+        number = 50 if count == 1_000 else 10
+        
+        results.append(measure(
+            f"AvailabilityResponse build      {count} slots",
+            lambda: build_response(slots), number=number, repeat=3
+        ))
+        results.append(measure(
+            f"model_dump_json                 {count} slots",
+            response.model_dump_json, number=number, repeat=3
+        ))
+        results.append(measure(
+            f"jsonable_encoder + json.dumps   {count} slots",
+            lambda: json.dumps(jsonable_encoder(response)), number=number, repeat=3
+        ))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run())
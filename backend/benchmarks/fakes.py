@@ -0,0 +1,118 @@
+"""
+In-process stand-ins for Postgres, Google Calendar and SMTP, so the
+service-level benchmarks run offline and measure only our own code.
+
+    with fake_backends(FakeDatabase(...), FakeGoogleCalendar(...), FakeSMTP()):
+        AvailabilityService.get_available_slots(...)
+"""
+import random
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+from app.core.config import settings
+from app.models.repositories import MeetingRepository, UserRepository
+from app.services import email_service
+from app.services.availability import AvailabilityService
+from app.services.email_service import SMTPCredentials
+from app.services.google_calendar import GoogleCalendarService
+
+
+class FakeDatabase:
+    """Users, meetings and SMTP credentials held in dicts."""
+    
+    def __init__(self, meetings_by_host: dict = None):
+        self.meetings_by_host = meetings_by_host or {}
+        self.queries = 0
+    
+    def get_user_by_id(self, user_id: int) -> dict:
+        self.queries += 1
+        return {
+            'id': user_id,
+            'email': f"host{user_id}@example.com",
+            'username': f"host{user_id}",
+            'google_access_token': "encrypted-access-token",
+        }
+    
+    def get_busy_ranges_for_host(self, host_id: int, start_date: datetime, end_date: datetime) -> list:
+        self.queries += 1
+        return [
+            m for m in self.meetings_by_host.get(host_id, [])
+            if m['start_ts'] < end_date and m['end_ts'] > start_date
+        ]
+    
+    async def get_user_smtp_credentials(self, user_id: int) -> SMTPCredentials:
+        self.queries += 1
+        return SMTPCredentials("smtp.example.com", 587, f"host{user_id}@example.com", "app-password")
+
+
+class FakeGoogleCalendar:
+    """Free/busy answers from memory, in the API's RFC 3339 'Z' format."""
+    
+    def __init__(self, busy_by_host: dict = None):
+        self.busy_by_host = busy_by_host or {}
+        self.calls = 0
+    
+    def get_busy_times(self, user_id: int, start_time: datetime, end_time: datetime, use_cache: bool = True) -> list:
+        self.calls += 1
+        return self.busy_by_host.get(user_id, [])
+
+
+class FakeSMTP:
+    """Accepts messages and flattens them to bytes, as a real send would."""
+    
+    def __init__(self):
+        self.sent = 0
+        self.bytes_sent = 0
+    
+    async def send(self, credentials, msg):
+        self.sent += 1
+        self.bytes_sent += len(msg.as_bytes())
+
+
+@contextmanager
+def fake_backends(db: FakeDatabase, google: FakeGoogleCalendar = None, smtp: FakeSMTP = None):
+    """
+    Route repository, Google and SMTP calls to the fakes. The free-slot store
+    is disabled so availability always runs the live engine.
+    """
+    google = google or FakeGoogleCalendar()
+    smtp = smtp or FakeSMTP()
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(UserRepository, "get_user_by_id", db.get_user_by_id))
+        stack.enter_context(mock.patch.object(
+            MeetingRepository, "get_busy_ranges_for_host", db.get_busy_ranges_for_host
+        ))
+        stack.enter_context(mock.patch.object(GoogleCalendarService, "get_busy_times", google.get_busy_times))
+        stack.enter_context(mock.patch.object(
+            email_service, "get_user_smtp_credentials_async", db.get_user_smtp_credentials
+        ))
+        stack.enter_context(mock.patch.object(email_service.async_smtp, "send", smtp.send))
+        stack.enter_context(mock.patch.object(settings, "FREE_SLOT_STORE_ENABLED", False))
+        yield
+
+
+def synthetic_calendar(rng: random.Random, start: datetime, days: int, events_per_day: int) -> tuple:
+    """
+    A host calendar with `events_per_day` busy blocks per day, mostly inside
+    working hours. Half are booked meetings (DB rows), half come from
+    Google free/busy. Returns (meetings, google_busy).
+    """
+    meetings = []
+    google_busy = []
+    first_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in range(days):
+        day_start = first_day + timedelta(days=day)
+        for i in range(events_per_day):
+            begin = day_start + timedelta(
+                hours=rng.randint(AvailabilityService.DEFAULT_START_HOUR - 1, AvailabilityService.DEFAULT_END_HOUR),
+                minutes=rng.choice((0, 15, 30, 45))
+            )
+            end = begin + timedelta(minutes=rng.choice((15, 30, 45, 60, 90)))
+            if i % 2 == 0:
+                meetings.append({'start_ts': begin, 'end_ts': end})
+            else:
+                google_busy.append({
+                    'start': begin.isoformat() + 'Z',
+                    'end': end.isoformat() + 'Z',
+                })
+    return meetings, google_busy
@@ -0,0 +1,22 @@
+import timeit
+from typing import Callable
+
+
+def measure(name: str, fn: Callable, number: int = 1000, repeat: int = 5) -> dict:
+    """Time fn() and return the best per-call cost over several runs."""
+    timings = timeit.repeat(fn, number=number, repeat=repeat)
+    best = min(timings) / number
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "per_call_us": round(best * 1_000_000, 3),
+        "ops_per_sec": round(1 / best, 1) if best > 0 else None,
+    }
+
+
+def print_results(results: list):
+    """Print benchmark results as an aligned table."""
+    width = max(len(r["name"]) for r in results)
+    for r in results:
+        print(f"{r['name']:<{width}}  {r['per_call_us']:>14.3f} us/call  {r['ops_per_sec']:>14.1f} ops/s")
@@ -4,8 +4,16 @@
 -- Create database (run as superuser)
 -- CREATE DATABASE meets_db;
 
+-- The backend applies the numbered migrations in app/core/migrations.py on
+-- startup (recorded in schema_migrations); this file mirrors the resulting
+-- schema. A database created from it is adopted by re-running the
+-- idempotent migrations once.
+
 -- Connect to meets_db and run the following:
 
+-- Needed to combine host_id equality with range overlap in one GiST index
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
@@ -14,6 +22,9 @@ CREATE TABLE IF NOT EXISTS users (
     google_access_token TEXT,
     google_refresh_token TEXT,
     token_expiry TIMESTAMP,
+    -- Bumped on booking, SMTP or token changes; used for ETags
+    change_version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -30,13 +41,25 @@ CREATE TABLE IF NOT EXISTS meetings (
     meet_link TEXT NOT NULL,
     google_event_id TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT no_overlapping_meetings UNIQUE (host_id, start_ts, end_ts)
+    -- No two meetings of the same host may overlap (backed by a GiST index)
+    CONSTRAINT meetings_no_overlap EXCLUDE USING gist (
+        host_id WITH =,
+        tsrange(start_ts, end_ts) WITH &&
+    )
 );
 
 -- Index for faster availability queries
 CREATE INDEX IF NOT EXISTS idx_meetings_host_time 
 ON meetings(host_id, start_ts, end_ts);
 
+-- Keyset pagination of meeting lists on (start_ts, id)
+CREATE INDEX IF NOT EXISTS idx_meetings_host_start_id
+ON meetings(host_id, start_ts, id);
+
+-- Background refresher scan for Google tokens about to expire
+CREATE INDEX IF NOT EXISTS idx_users_token_expiry
+ON users(token_expiry) WHERE google_refresh_token IS NOT NULL;
+
 -- Index for username lookups
 CREATE INDEX IF NOT EXISTS idx_users_username 
 ON users(username);
@@ -75,3 +98,101 @@ CREATE TRIGGER trigger_single_active_smtp
     BEFORE INSERT OR UPDATE ON smtp_accounts
     FOR EACH ROW
     EXECUTE FUNCTION ensure_single_active_smtp();
+
+-- Transactional email outbox (written with the meeting, drained by the outbox worker)
+-- status: pending -> sent, or dead after OUTBOX_MAX_ATTEMPTS failures
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    meeting_id INT REFERENCES meetings(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Index for due pending messages
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due 
+ON email_outbox(next_attempt_at) WHERE status = 'pending';
+
+-- Materialized free slots (default slot duration), maintained by the
+-- sync_host_free_slots trigger and the background free-slot refresher
+CREATE TABLE IF NOT EXISTS host_slot_days (
+    host_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    slot_date DATE NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (host_id, slot_date)
+);
+
+CREATE TABLE IF NOT EXISTS host_free_slots (
+    host_id INT NOT NULL,
+    slot_date DATE NOT NULL,
+    start_ts TIMESTAMP NOT NULL,
+    end_ts TIMESTAMP NOT NULL,
+    PRIMARY KEY (host_id, start_ts),
+    FOREIGN KEY (host_id, slot_date)
+        REFERENCES host_slot_days(host_id, slot_date) ON DELETE CASCADE
+);
+
+-- New meetings remove the slots they overlap; removed or moved meetings
+-- send their days back for recomputation
+CREATE OR REPLACE FUNCTION sync_host_free_slots()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM pg_advisory_xact_lock(hashtext('host_free_slots'), OLD.host_id);
+        DELETE FROM host_slot_days
+        WHERE host_id = OLD.host_id
+        AND slot_date BETWEEN OLD.start_ts::date AND OLD.end_ts::date;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_advisory_xact_lock(hashtext('host_free_slots'), NEW.host_id);
+        DELETE FROM host_free_slots
+        WHERE host_id = NEW.host_id
+        AND tsrange(start_ts, end_ts) && tsrange(NEW.start_ts, NEW.end_ts);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_sync_host_free_slots ON meetings;
+CREATE TRIGGER trigger_sync_host_free_slots
+    AFTER INSERT OR UPDATE OR DELETE ON meetings
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_host_free_slots();
+
+-- Bump the owning user's change_version when their meetings or SMTP
+-- accounts change; TG_ARGV[0] names the user id column
+CREATE OR REPLACE FUNCTION bump_user_change_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := to_jsonb(OLD);
+    ELSE
+        changed := to_jsonb(NEW);
+    END IF;
+    UPDATE users
+    SET change_version = change_version + 1,
+        changed_at = now() AT TIME ZONE 'utc'
+    WHERE id = (changed ->> TG_ARGV[0])::int;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_meetings_change_version ON meetings;
+CREATE TRIGGER trigger_meetings_change_version
+    AFTER INSERT OR UPDATE OR DELETE ON meetings
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_user_change_version('host_id');
+
+DROP TRIGGER IF EXISTS trigger_smtp_accounts_change_version ON smtp_accounts;
+CREATE TRIGGER trigger_smtp_accounts_change_version
+    AFTER INSERT OR UPDATE OR DELETE ON smtp_accounts
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_user_change_version('user_id');
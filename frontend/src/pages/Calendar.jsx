@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { localApi } from '../services/companyApi';
+import { meetingsApi } from '../services/companyApi';
 
 function Calendar() {
   // Get user from localStorage
@@ -8,6 +8,8 @@ function Calendar() {
   
   const [meetings, setMeetings] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [currentDate, setCurrentDate] = useState(new Date());
 
   useEffect(() => {
@@ -16,12 +18,10 @@ function Calendar() {
 
   const fetchMeetings = async () => {
     try {
-      // Fetch meetings from local backend
-      const response = await localApi.get(`/meetings?user_id=${userId}`);
-      if (response.status === 200) {
-        const data = response.data;
-        setMeetings(data.meetings || []);
-      }
+      // Fetch the first page of meetings from local backend
+      const page = await meetingsApi.getPage(userId);
+      setMeetings(page.meetings);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error('[Calendar] Failed to fetch meetings:', err.response?.data || err.message);
     } finally {
@@ -29,6 +29,19 @@ function Calendar() {
     }
   };
 
+  const loadMoreMeetings = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await meetingsApi.getPage(userId, nextCursor);
+      setMeetings((current) => [...current, ...page.meetings]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('[Calendar] Failed to load more meetings:', err.response?.data || err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Calendar helpers
   const getDaysInMonth = (date) => {
     return new Date(date.getFullYear(), date.getMonth() + 1, 0).getDate();
@@ -208,6 +221,19 @@ function Calendar() {
         )}
       </div>
 
+      {/* Load More */}
+      {!loading && nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={loadMoreMeetings}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm font-bold text-slate-700 bg-slate-100 rounded-xl hover:bg-slate-200 transition-all disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more meetings'}
+          </button>
+        </div>
+      )}
+
       {/* Legend */}
       <div className="bg-white rounded-2xl shadow-sm border border-slate-100 p-4">
         <div className="flex flex-wrap items-center gap-4 text-sm">
@@ -172,6 +172,26 @@ export const teamsApi = {
   },
 };
 
+// ==================== MEETINGS API ====================
+
+// Meetings fetched per request; the UI loads further pages on demand
+const MEETINGS_PAGE_SIZE = 100;
+
+export const meetingsApi = {
+  // Get one page of a user's meetings; pass next_cursor back as cursor for the following page
+  getPage: async (userId, cursor = null) => {
+    const params = { user_id: userId, limit: MEETINGS_PAGE_SIZE };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    const response = await localApi.get('/meetings', { params });
+    return {
+      meetings: response.data.meetings || [],
+      nextCursor: response.data.next_cursor,
+    };
+  },
+};
+
 // Export the local API for meetings/availability/booking/smtp
 export { localApi };
 